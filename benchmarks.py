@@ -0,0 +1,124 @@
+# MIT 6.034 Lab 2: Games
+# Benchmarks for the game API. Run with: python3 benchmarks.py
+
+import gc
+import random
+import time
+import tracemalloc
+
+from game_api import *
+from lab2 import *
+
+def expand_tree(state, depth) :
+    "Return every state in the game tree below state, down to the given depth."
+    frontier, tree = [state], [state]
+    for _ in range(depth) :
+        frontier = [child for parent in frontier for child in parent.generate_next_states()]
+        tree += frontier
+    return tree
+
+class ReferenceBoard :
+    """A board laid out the way ConnectFourBoard stored itself before the
+    bitboard rewrite: a list of row lists of pieces, and per-board copies of
+    the players list and move description, all in an instance __dict__."""
+    def __init__(self, board) :
+        self.board_array = [list(row) for row in board.board_array]
+        self.prev_move_string = board.describe_previous_move()
+        self.players = list(board.players)
+        self.whose_turn = board.whose_turn
+
+class ReferenceState :
+    """A game state laid out the way AbstractGameState stored itself before
+    __slots__ and memoization: its snapshot and rule functions in a __dict__."""
+    def __init__(self, state) :
+        self.snapshot = ReferenceBoard(state.snapshot)
+        self.starting_state = self.snapshot
+        self.is_game_over_fn = state._rules.is_game_over_fn
+        self.generate_next_states_fn = state._rules.generate_next_states_fn
+        self.endgame_score_fn = state._rules.endgame_score_fn
+
+def traced_memory_per_node(build) :
+    """Call build(), which returns a list of nodes, and return the nodes and
+    the memory still held per node once it has finished."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return nodes, (after - before) / len(nodes)
+
+def benchmark_memory_per_node(depth=4) :
+    """Expand the Connect Four tree from an empty board and report the
+    memory held per node (an AbstractGameState and its ConnectFourBoard),
+    against a ReferenceState and ReferenceBoard copied from each node."""
+    root = AbstractGameState(snapshot = ConnectFourBoard(),
+                             is_game_over_fn = is_game_over_connectfour,
+                             generate_next_states_fn = next_boards_connectfour,
+                             endgame_score_fn = endgame_score_connectfour)
+    tree, per_node = traced_memory_per_node(lambda : expand_tree(root, depth))
+    _, reference = traced_memory_per_node(lambda : [ReferenceState(state) for state in tree])
+    print("memory per node:  %6.0f bytes, reference %.0f bytes, %.0f%% less (%i nodes, depth %i)"
+          % (per_node, reference, 100 * (1 - per_node / reference), len(tree), depth))
+
+def benchmark_add_piece(repeat=20000) :
+    "Report the time taken by ConnectFourBoard.add_piece."
+    board = ConnectFourBoard().add_piece(3).add_piece(3).add_piece(2)
+    start = time.perf_counter()
+    for i in range(repeat) :
+        board.add_piece(i % board.num_cols)
+    elapsed = time.perf_counter() - start
+    print("add_piece:        %6.2f us" % (1e6 * elapsed / repeat))
+
+def random_boards(count, seed=0) :
+    "Return count random, unfinished ConnectFourBoards."
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count :
+        board = ConnectFourBoard()
+        for _ in range(rng.randint(0, 30)) :
+            board = board.add_piece(rng.choice([col for col in range(board.num_cols)
+                                                if not board.is_column_full(col)]))
+            if is_game_over_connectfour(board) :
+                break
+        else :
+            boards.append(board)
+    return boards
+
+def benchmark_batch_heuristic(count=10000) :
+    """Compare scoring boards one at a time with heuristic_connectfour against
+    heuristic_connectfour_batch (which requires NumPy)."""
+    boards = random_boards(count)
+    fresh = [ConnectFourBoard(board.board_array) for board in boards]
+    start = time.perf_counter()
+    for board in fresh :
+        heuristic_connectfour(board, True)
+    scalar = time.perf_counter() - start
+    start = time.perf_counter()
+    heuristic_connectfour_batch(boards, True)
+    batch = time.perf_counter() - start
+    print("heuristic:        %6.2f us per board, batched %.2f us (%i boards)"
+          % (1e6 * scalar / count, 1e6 * batch / count, count))
+
+def benchmark_batch_minimax(depth=5) :
+    """Compare minimax_search with heuristic_connectfour against scoring the
+    frontier with heuristic_connectfour_batch (which requires NumPy)."""
+    root = AbstractGameState(snapshot = ConnectFourBoard(),
+                             is_game_over_fn = is_game_over_connectfour,
+                             generate_next_states_fn = iter_next_boards_connectfour,
+                             endgame_score_fn = endgame_score_connectfour)
+    start = time.perf_counter()
+    minimax_search(root.wrap(root.snapshot), heuristic_connectfour, depth)
+    scalar = time.perf_counter() - start
+    start = time.perf_counter()
+    minimax_search(root.wrap(root.snapshot), depth_limit=depth,
+                   batch_heuristic_fn=heuristic_connectfour_batch)
+    batch = time.perf_counter() - start
+    print("minimax_search:   %6.2f s, batched %.2f s (depth %i)" % (scalar, batch, depth))
+
+if __name__ == "__main__" :
+    benchmark_memory_per_node()
+    benchmark_add_piece()
+    if numpy is not None :
+        benchmark_batch_heuristic()
+        benchmark_batch_minimax()
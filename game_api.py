@@ -1,24 +1,81 @@
 # MIT 6.034 Lab 2: Games
 
+from collections import namedtuple, OrderedDict
 from copy import deepcopy
 from functools import reduce
+from itertools import chain, islice
+import random
+
+try :
+    import numpy
+except ImportError :
+    numpy = None  # only needed for the batch functions below
 
 def always_zero(state, maximize=True):
     return 0
 
+# The three functions defining a game, shared by all states of that game
+GameRules = namedtuple('GameRules', ['is_game_over_fn', 'generate_next_states_fn',
+                                     'endgame_score_fn'])
+
 class AbstractGameState :
+    # slots instead of a __dict__ keep the many states of a search tree small
+    __slots__ = ('snapshot', 'starting_state', '_rules', 'memoize',
+                 '_game_over', '_endgame_scores', '_children', '_unbuilt_children')
 
     def __init__(self,
                  snapshot,
                  is_game_over_fn,
                  generate_next_states_fn,
-                 endgame_score_fn) :
+                 endgame_score_fn,
+                 memoize=True) :
+        """If memoize is True, the state remembers whether the game is over and
+        its endgame scores once they have been computed, so repeated calls
+        from the searchers are free. Pass memoize=False to recompute them on
+        every call.
+
+        Children are deliberately not memoized per state, so that a finished
+        search doesn't leave its whole tree reachable from the root. To see
+        whether there are moves left, is_game_over builds the first child and
+        keeps it, with whatever produces the rest, until the children are
+        handed out by generate_next_states or iter_next_states. That is only
+        a suspended generator if generate_next_states_fn is a generator (like
+        iter_next_boards_connectfour), but the whole list of next snapshots if
+        it returns a list (like next_boards_connectfour)."""
 
         self.snapshot = snapshot
         self.starting_state = snapshot
-        self.is_game_over_fn = is_game_over_fn
-        self.generate_next_states_fn = generate_next_states_fn
-        self.endgame_score_fn = endgame_score_fn
+        self._rules = GameRules(is_game_over_fn, generate_next_states_fn, endgame_score_fn)
+        self.memoize = memoize
+        self.__clear_cache__()
+
+    @property
+    def is_game_over_fn(self) :
+        return self._rules.is_game_over_fn
+
+    @property
+    def generate_next_states_fn(self) :
+        return self._rules.generate_next_states_fn
+
+    @property
+    def endgame_score_fn(self) :
+        return self._rules.endgame_score_fn
+
+    def __clear_cache__(self) :
+        self._game_over = None
+        self._endgame_scores = None  # [score if minimizer, score if maximizer]
+        self._children = None  # children built by is_game_over, until handed out
+        self._unbuilt_children = None  # iterator producing the rest
+
+    def __getstate__(self) :
+        # copies and pickles don't carry the cached subtree along
+        return {'snapshot': self.snapshot, 'starting_state': self.starting_state,
+                '_rules': self._rules, 'memoize': self.memoize}
+
+    def __setstate__(self, state) :
+        for name, value in state.items() :
+            setattr(self, name, value)
+        self.__clear_cache__()
 
     def __str__(self) :
         return "\n<AbstractGameState representing:\n" + self.snapshot.__str__() + "\n>"
@@ -27,18 +84,50 @@ class AbstractGameState :
         return (is_class_instance(other, 'AbstractGameState')
                 and self.snapshot.__eq__(other.snapshot))
 
+    def __hash__(self):
+        return hash(self.snapshot)
+
     def wrap(self, snapshot) :
-        return AbstractGameState(snapshot, self.is_game_over_fn,
-                                 self.generate_next_states_fn, self.endgame_score_fn)
+        # the new state shares this state's rules rather than building its own
+        state = AbstractGameState.__new__(AbstractGameState)
+        state.snapshot = state.starting_state = snapshot
+        state._rules = self._rules
+        state.memoize = self.memoize
+        state.__clear_cache__()
+        return state
 
     def get_snapshot(self):
         return self.snapshot
 
     def is_game_over(self) :
-        return len(self.generate_next_states()) == 0 or self.is_game_over_fn(self.snapshot)
+        if self._game_over is None :
+            # only the first child (if any) is built to see whether there are moves left
+            if not self.memoize :
+                return (self._rules.is_game_over_fn(self.snapshot)
+                        or next(self.iter_next_states(), None) is None)
+            self._game_over = (self._rules.is_game_over_fn(self.snapshot)
+                               or self.__peek_child__() is None)
+        return self._game_over
 
     def generate_next_states(self) :
-        return list(map(self.wrap, self.generate_next_states_fn(self.snapshot)))
+        return list(self.iter_next_states())
+
+    def iter_next_states(self) :
+        """Return an iterator over the next states. If generate_next_states_fn
+        is a generator, each child is only built when the iterator reaches it."""
+        if self._children is None :
+            return map(self.wrap, self._rules.generate_next_states_fn(self.snapshot))
+        # hand the child built by is_game_over over to the caller
+        children = chain(self._children, self._unbuilt_children)
+        self._children = self._unbuilt_children = None
+        return children
+
+    def __peek_child__(self) :
+        "Build and keep the first child, if there is one, and return it."
+        if self._children is None :
+            self._unbuilt_children = map(self.wrap, self._rules.generate_next_states_fn(self.snapshot))
+            self._children = list(islice(self._unbuilt_children, 1))
+        return self._children[0] if self._children else None
 
     def describe_previous_move(self) :
         return self.snapshot.describe_previous_move()
@@ -47,34 +136,101 @@ class AbstractGameState :
         # only for leaf nodes
         if not self.is_game_over() :
             raise ValueError("Only endgame states have endgame score defined.")
-        return self.endgame_score_fn(self.snapshot, is_current_player_maximizer)
+        if not self.memoize :
+            return self._rules.endgame_score_fn(self.snapshot, is_current_player_maximizer)
+        if self._endgame_scores is None :
+            self._endgame_scores = [None, None]
+        index = bool(is_current_player_maximizer)
+        if self._endgame_scores[index] is None :
+            self._endgame_scores[index] = self._rules.endgame_score_fn(self.snapshot,
+                                                                       is_current_player_maximizer)
+        return self._endgame_scores[index]
 
     def restart(self) :
         self.snapshot = self.starting_state
+        self.__clear_cache__()
         return self
 
     def copy(self):
         return deepcopy(self)
 
 
+# Zobrist keys for ConnectFourBoard hashing, per (num_rows, num_cols) geometry
+ZOBRIST_KEYS = {}
+
+# Lines of cells that ConnectFourBoard chains are read along, per geometry
+CHAIN_LINES = {}
+
+# Four-cell windows (possible lines of four) and neighbors of ConnectFourBoard
+# cells, per geometry
+CELL_TABLES = {}
+
 class ConnectFourBoard :
     num_rows = 6  # board height
     num_cols = 7  # board width
+    __slots__ = ('_masks', '_counts', '_heights', '_last_move', '_has_four',
+                 '_move_stack', '_zobrist', '_mirror_zobrist', '_prev_move', 'players', 'whose_turn',
+                 '_chain_counts', '_window_counts')
 
     def __init__(self, board_array=None, players=['Player One','Player Two'],
                  whose_turn=None) :
-        """A board array is a list of rows. The pieces are either 0 (no player), 1, or 2."""
+        """A board array is a list of rows. The pieces are either 0 (no player), 1, or 2.
+        Internally the pieces are stored as two bitboards (one integer mask per
+        piece type) plus a table of column heights."""
         if (not isinstance(players, (list, tuple))) or len(players) != 2:
             raise TypeError("Expected list of two players, got "+str(players))
-        if not board_array :
-            board_array = [[0 for c in range(ConnectFourBoard.num_cols)] for r in range(ConnectFourBoard.num_rows)]
-        self.board_array = [ [x if x is not 0 else None for x in row] for row in board_array]
-        self.prev_move_string = 'none'
+        self.board_array = board_array
+        self._prev_move = 'none'
         self.players = players[:]
         self.whose_turn = whose_turn if whose_turn in players else players[0]
         if self.whose_turn != self.players[0] :
             self.players.reverse()
 
+    @property
+    def board_array(self) :
+        """The board as a list of rows (top row first), with None for empty
+        cells and 1 or 2 for pieces. Built from the bitboards on each access."""
+        return [[self.get_piece(c, r) for c in range(self.num_cols)]
+                for r in range(self.num_rows)]
+
+    @board_array.setter
+    def board_array(self, board_array) :
+        self._masks = [0, 0]
+        self._counts = [0, 0]  # pieces of each type, kept alongside _masks
+        self._heights = bytearray(self.num_cols)
+        self._last_move = None
+        self._has_four = None  # unknown until first asked
+        self._move_stack = ()  # becomes a list on the first play()
+        self._zobrist = self._mirror_zobrist = 0
+        self._chain_counts = None  # only kept once get_chain_counts is called
+        self._window_counts = None  # only kept once get_window_counts is called
+        if not board_array :
+            return
+        for r, row in enumerate(board_array) :
+            for c, piece in enumerate(row) :
+                if piece :
+                    self._masks[piece - 1] |= self.__bit__(c, r)
+                    self._counts[piece - 1] += 1
+                    self.__toggle_zobrist__(piece, c, r)
+        # a column's height is its contiguous stack of pieces, counted from the bottom
+        occupied = self._masks[0] | self._masks[1]
+        for c in range(self.num_cols) :
+            while (self._heights[c] < self.num_rows
+                   and occupied & self.__bit__(c, self.num_rows - 1 - self._heights[c])) :
+                self._heights[c] += 1
+
+    def __bit__(self, col, row) :
+        """Return the bitboard mask for the cell at (col, row), where row 0 is
+        the top row. Each column takes num_rows+1 bits, bottom cell first; the
+        extra bit is an always-empty sentinel that keeps lines from wrapping
+        around between columns."""
+        num_rows, num_cols = self.num_rows, self.num_cols
+        if not (0 <= col < num_cols and 0 <= row < num_rows) :
+            if -num_cols <= col < num_cols and -num_rows <= row < num_rows :
+                return self.__bit__(col % num_cols, row % num_rows)
+            raise IndexError("No cell at col "+str(col)+", row "+str(row)+".")
+        return 1 << (col * (num_rows + 1) + num_rows - 1 - row)
+
     def get_current_player_name(self) :
         """Return the current player. By default, 'Player One' or 'Player Two'."""
         return self.whose_turn
@@ -97,7 +253,8 @@ class ConnectFourBoard :
         return p if self.__piece_type__(p) == player_number else q
 
     def get_piece(self, col, row) :
-        return self.board_array[row][col]
+        bit = self.__bit__(col, row)
+        return 1 if self._masks[0] & bit else 2 if self._masks[1] & bit else None
 
     def count_pieces(self, current_player=None) :
         """Return the total number of pieces on the board. If player is
@@ -105,19 +262,14 @@ class ConnectFourBoard :
         if current_player not in [True, False, None]:
             raise TypeError("Expected boolean value for current_player, got "
                             + str(current_player))
+        if current_player is None :
+            return self._counts[0] + self._counts[1]
         piece_type = self.__piece_type__(self.get_current_player_name() if current_player else self.get_other_player_name())
-        player_test = (lambda x: x) if current_player is None else (lambda piece: piece == piece_type)
-        return len(list(filter(player_test, sum(self.board_array,[]))))
+        return self._counts[piece_type - 1]
 
     def get_column_height(self, col_number) :
         """Return the number of pieces in the column; e.g., 0 if the column is empty."""
-        height = 0
-        for row in reversed(self.board_array) :
-            if row[col_number] :
-                height += 1
-            else :
-                break
-        return height
+        return self._heights[col_number]
 
     def is_column_full(self, col_number) :
         "Return True if column is full, False otherwise"
@@ -126,48 +278,289 @@ class ConnectFourBoard :
     def add_piece(self, col_number, player=None) :
         """Adds a piece belonging to the player to the given column.
         Returns new board without modifying original."""
+        new_board = self.copy()
+        new_board.__drop__(col_number, player)
+        return new_board
+
+    def play(self, col_number, player=None) :
+        """Like add_piece, but modifies this board in place and records the
+        move so that it can be reverted with undo(). Returns the board."""
+        if not self._move_stack :
+            self._move_stack = []
+        self._move_stack.append((col_number, self._heights[col_number], self._prev_move,
+                                 self._last_move, self._has_four))
+        try :
+            self.__drop__(col_number, player)
+        except IndexError :
+            self._move_stack.pop()
+            raise
+        return self
+
+    def undo(self) :
+        """Revert the most recent move made with play(). Returns the board."""
+        if not self._move_stack :
+            raise IndexError("No moves to undo.")
+        (col_number, height, self._prev_move,
+         self._last_move, self._has_four) = self._move_stack.pop()
+        self._heights[col_number] = height
+        row = self.num_rows - 1 - height
+        bit = self.__bit__(col_number, row)
+        piece_type = 1 if self._masks[0] & bit else 2
+        self._masks[piece_type - 1] &= ~bit
+        if self._chain_counts is not None :
+            self.__count_chains_through__(piece_type, col_number, row, -1)
+        if self._window_counts is not None :
+            self.__count_windows_through__(piece_type, col_number, row, -1)
+        self._counts[piece_type - 1] -= 1
+        self.__toggle_zobrist__(piece_type, col_number, row)
+        self.set_current_player_name(self.players[1])
+        return self
 
+    def __drop__(self, col_number, player=None) :
+        "Add a piece to the given column of this board, modifying it."
         if self.is_column_full(col_number) :
             raise IndexError("Can't add piece to full column "+str(col_number)+".")
 
         player = player or self.whose_turn
         piece_type = self.__piece_type__(player)
-        new_board = self.copy()
-        height = 1 + new_board.get_column_height(col_number)
-        new_board.board_array[-height][col_number] = piece_type
-        new_board.prev_move_string = ("Put " + str(player)
-                                      + "'s piece in col " + str(col_number))
+        row = self.num_rows - 1 - self._heights[col_number]
+        if self._chain_counts is not None :
+            self.__count_chains_through__(piece_type, col_number, row, +1)
+        if self._window_counts is not None :
+            self.__count_windows_through__(piece_type, col_number, row, +1)
+        bit = self.__bit__(col_number, row)
+        self._masks[piece_type - 1] |= bit
+        self._counts[piece_type - 1] += 1
+        self._heights[col_number] += 1
+        # in boards built from arrays, pieces left floating above a gap join
+        # the stack once the gap is filled (the sentinel bit stops the loop)
+        occupied = self._masks[0] | self._masks[1]
+        while occupied & (bit << 1) :
+            bit <<= 1
+            self._heights[col_number] += 1
+        self.__toggle_zobrist__(piece_type, col_number, row)
+        self._last_move = (col_number, row)
+        # only lines through the new piece can have become four in a row
+        if not self._has_four :
+            self._has_four = True if self.__four_through__(col_number, row) else self._has_four
+        # the description is only formatted if someone asks for it
+        self._prev_move = (player, col_number)
         # adding a piece causes the current player to swap
-        new_board.set_current_player_name(new_board.players[1])
-        return new_board
+        self.set_current_player_name(self.players[1])
 
     def describe_previous_move(self) :
         "Returns a string describing the most recent move leading to current state"
         return self.prev_move_string
 
-    def copy(self) :
-        return deepcopy(self)
+    @property
+    def prev_move_string(self) :
+        """The description of the most recent move. Moves made by add_piece or
+        play are stored as a (player, column) pair and only turned into a
+        string when read."""
+        if isinstance(self._prev_move, tuple) :
+            return self.__describe_move__(*self._prev_move)
+        return self._prev_move
+
+    @prev_move_string.setter
+    def prev_move_string(self, prev_move_string) :
+        self._prev_move = prev_move_string
+
+    def __describe_move__(self, player, col_number) :
+        return "Put " + str(player) + "'s piece in col " + str(col_number)
+
+    def get_last_move(self) :
+        """Return the (col, row) of the most recently added piece, or None if
+        the board was not produced by add_piece."""
+        return self._last_move
+
+    def has_four_in_a_row(self) :
+        """Return True if either player has a chain of four or more pieces.
+        Boards produced by add_piece only check the lines through the last
+        piece; other boards are checked once with whole-board shifts."""
+        if self._has_four is None :
+            h = self.num_rows + 1
+            self._has_four = False
+            for mask in self._masks :
+                for shift in (1, h - 1, h, h + 1) :
+                    pairs = mask & (mask >> shift)
+                    if pairs & (pairs >> 2*shift) :
+                        self._has_four = True
+        return self._has_four
+
+    def get_chain_counts(self, current_player=True) :
+        """Return [singletons, pairs, longer] for the current player (or the
+        other player, if current_player is False): the number of chains of
+        length 1, of length 2, and of length 3 or more among get_all_chains.
+
+        The first call finds all the chains. After that, the counts are kept
+        up to date as pieces are added or undone, on this board and on the
+        boards made from it, by looking only at the lines through each new
+        piece. Call it on the board at the root of a search to have every
+        board in the search keep them."""
+        if current_player not in [True, False]:
+            raise TypeError("Expected boolean value for current_player, got "
+                            + str(current_player))
+        if self._chain_counts is None :
+            self._chain_counts = [0] * 6
+            for chain in self.get_all_chains() :
+                self._chain_counts[3 * (chain[0] - 1) + min(len(chain), 3) - 1] += 1
+        piece_type = self.__piece_type__(self.get_current_player_name() if current_player else self.get_other_player_name())
+        return self._chain_counts[3 * (piece_type - 1) : 3 * piece_type]
+
+    def __count_chains_through__(self, piece_type, col, row, sign) :
+        """Update _chain_counts for a piece of piece_type being added at the
+        empty cell (col, row) if sign is +1, or having just been removed from
+        it if sign is -1. Only the chains through the cell and the singletons
+        next to it change."""
+        h = self.num_rows + 1
+        bit = self.__bit__(col, row)
+        mask = self._masks[piece_type - 1]
+        counts, base = self._chain_counts, 3 * (piece_type - 1)
+        for shift in (1, h - 1, h, h + 1) :
+            # the runs on either side of the cell join into one through it
+            forward = backward = 0
+            cell = bit << shift
+            while mask & cell :
+                forward, cell = forward + 1, cell << shift
+            cell = bit >> shift
+            while mask & cell :
+                backward, cell = backward + 1, cell >> shift
+            for length in (forward, backward) :
+                if length >= 2 :
+                    counts[base + (1 if length == 2 else 2)] -= sign
+            if forward or backward :
+                counts[base + (1 if forward + backward == 1 else 2)] += sign
+        # neighbors that were singletons stop being singletons
+        neighbors = self.__cell_tables__()[2]
+        friends = mask & neighbors[bit.bit_length() - 1]
+        if not friends :
+            counts[base] += sign
+        while friends :
+            friend = friends & -friends
+            friends ^= friend
+            if not mask & neighbors[friend.bit_length() - 1] :
+                counts[base] -= sign
+
+    def get_window_counts(self, current_player=True) :
+        """Return a list whose k-th element is the number of windows (sets of
+        four cells in a line, of which a 6x7 board has 69) that hold k pieces
+        of the current player (or the other player, if current_player is
+        False) and none of their opponent's; element 0 counts the empty
+        windows.
+
+        Like get_chain_counts, the first call counts all the windows, and
+        after that the counts are kept up to date, by looking only at the
+        windows through each new piece."""
+        if current_player not in [True, False]:
+            raise TypeError("Expected boolean value for current_player, got "
+                            + str(current_player))
+        if self._window_counts is None :
+            self._window_counts = [0] * 10
+            for window in self.__cell_tables__()[0] :
+                self.__count_window__(window, self._masks[0], self._masks[1], +1)
+        piece_type = self.__piece_type__(self.get_current_player_name() if current_player else self.get_other_player_name())
+        return self._window_counts[5 * (piece_type - 1) : 5 * piece_type]
+
+    def __cell_tables__(self) :
+        """Return, for this board's geometry, the four-cell windows as
+        bitmasks, a list of the windows through each cell, and a list of the
+        mask of each cell's neighbors, both indexed like the bitboards. Built
+        once per geometry."""
+        geometry = (self.num_rows, self.num_cols)
+        if geometry not in CELL_TABLES :
+            windows = []
+            for col in range(self.num_cols) :
+                for row in range(self.num_rows) :
+                    for dx, dy in [(1, 0), (0, 1), (1, 1), (1, -1)] :
+                        cells = [(col + i*dx, row + i*dy) for i in range(4)]
+                        if all(0 <= x < self.num_cols and 0 <= y < self.num_rows for (x, y) in cells) :
+                            windows.append(sum(self.__bit__(x, y) for (x, y) in cells))
+            through = [[] for index in range(self.num_cols * (self.num_rows + 1))]
+            for window in windows :
+                for index in range(len(through)) :
+                    if window >> index & 1 :
+                        through[index].append(window)
+            # shifts that leave the board land on sentinel bits, which are never set
+            h = self.num_rows + 1
+            board = sum(self.__bit__(col, row) for col in range(self.num_cols)
+                        for row in range(self.num_rows))
+            neighbors = [reduce(lambda mask, shift : mask | (1 << index << shift) | (1 << index >> shift),
+                                (1, h - 1, h, h + 1), 0) & board
+                         for index in range(len(through))]
+            CELL_TABLES[geometry] = (windows, through, neighbors)
+        return CELL_TABLES[geometry]
+
+    def __count_window__(self, window, mask1, mask2, sign) :
+        "Add sign to the entry of _window_counts that window falls under."
+        pieces1 = bin(window & mask1).count('1')
+        pieces2 = bin(window & mask2).count('1')
+        if not pieces2 :
+            self._window_counts[pieces1] += sign
+        if not pieces1 :
+            self._window_counts[5 + pieces2] += sign
+
+    def __count_windows_through__(self, piece_type, col, row, sign) :
+        """Update _window_counts for a piece of piece_type being added at the
+        empty cell (col, row) if sign is +1, or having just been removed from
+        it if sign is -1."""
+        bit = self.__bit__(col, row)
+        mask1, mask2 = self._masks
+        with_piece = (mask1 | bit, mask2) if piece_type == 1 else (mask1, mask2 | bit)
+        for window in self.__cell_tables__()[1][bit.bit_length() - 1] :
+            self.__count_window__(window, mask1, mask2, -sign)
+            self.__count_window__(window, with_piece[0], with_piece[1], sign)
+
+    def __zobrist_key__(self, piece_type, col, row) :
+        """Return the random 64-bit Zobrist key for a piece of the given type
+        at (col, row). Keys are fixed per board geometry."""
+        geometry = (self.num_rows, self.num_cols)
+        if geometry not in ZOBRIST_KEYS :
+            rng = random.Random(6034)
+            ZOBRIST_KEYS[geometry] = [[rng.getrandbits(64) for cell in range(self.num_rows * self.num_cols)]
+                                      for piece in (1, 2)]
+        return ZOBRIST_KEYS[geometry][piece_type - 1][col * self.num_rows + row]
+
+    def __toggle_zobrist__(self, piece_type, col, row) :
+        "Add or remove a piece at (col, row) in the hash and the mirror hash."
+        self._zobrist ^= self.__zobrist_key__(piece_type, col, row)
+        self._mirror_zobrist ^= self.__zobrist_key__(piece_type, self.num_cols - 1 - col, row)
+
+    def __four_through__(self, col, row) :
+        "Return True if the piece at (col, row) is part of a line of four or more."
+        h = self.num_rows + 1
+        index = col * h + self.num_rows - 1 - row
+        mask = self._masks[0] if (self._masks[0] >> index) & 1 else self._masks[1]
+        for shift in (1, h - 1, h, h + 1) :
+            run = 1
+            for step in (shift, -shift) :
+                i = index + step
+                while i >= 0 and (mask >> i) & 1 :
+                    run += 1
+                    i += step
+            if run >= 4 :
+                return True
+        return False
 
-    def __get_line__(self, col, row, dx, dy) :
-        """Return the list of pieces you get starting at (col, row) and
-        incrementing by dx,dy until you run out of board."""
-
-        indexes = [(col + i*dx, row + i*dy)
-                   for i in range((ConnectFourBoard.num_rows +
-                                      ConnectFourBoard.num_cols -1))]
-        # to determine if you've run out of board, see whether either col, row exceeds the max value
-        # or if the (col, row) changes from non-negative/negative or vice-versa.
-
-        pieces_line = []
-        for c,r in indexes :
-            if (c >= ConnectFourBoard.num_cols
-                or r >= ConnectFourBoard.num_rows
-                or c < -ConnectFourBoard.num_cols
-                or r < -ConnectFourBoard.num_rows) :
-                break
-            else :
-                pieces_line.append(self.get_piece(c, r))
-        return pieces_line
+    def copy(self) :
+        """Return an independent copy of this board. Only the small mutable
+        containers are duplicated; the bitboards themselves are immutable ints.
+        The copy starts with an empty undo history. The players list is shared,
+        since it is always replaced rather than modified."""
+        new_board = self.__class__.__new__(self.__class__)
+        new_board._masks = self._masks[:]
+        new_board._counts = self._counts[:]
+        new_board._heights = self._heights[:]
+        new_board._last_move = self._last_move
+        new_board._has_four = self._has_four
+        new_board._move_stack = ()
+        new_board._zobrist = self._zobrist
+        new_board._mirror_zobrist = self._mirror_zobrist
+        new_board._chain_counts = self._chain_counts and self._chain_counts[:]
+        new_board._window_counts = self._window_counts and self._window_counts[:]
+        new_board._prev_move = self._prev_move
+        new_board.players = self.players
+        new_board.whose_turn = self.whose_turn
+        return new_board
 
     def get_all_chains(self, current_player=None):
         """Get all maximal contiguous chains of pieces. If player is provided,
@@ -175,17 +568,14 @@ class ConnectFourBoard :
         if current_player not in [True, False, None]:
             raise TypeError("Expected boolean value for current_player, got "
                             + str(current_player))
-        piece_type = self.__piece_type__(self.get_current_player_name() if current_player else self.get_other_player_name())
-        player_test = (lambda chain: True) if current_player is None else (lambda chain : chain[0] == piece_type)
-
-        ret = []
-        ret += self.get_singleton_chains()
-        ret += self.get_horizontal_chains(False)
-        ret += self.get_vertical_chains(False)
-        ret += self.get_northeast_chains(False)
-        ret += self.get_northwest_chains(False)
+        piece_type = None
+        if current_player is not None :
+            piece_type = self.__piece_type__(self.get_current_player_name() if current_player else self.get_other_player_name())
 
-        ret = list(filter(player_test, ret))
+        # singletons, then horizontal, vertical, northeast and northwest
+        # chains, all read in one sweep over the precomputed lines
+        ret = self.__get_singletons__(piece_type)
+        ret += self.__get_runs__(self.__chain_lines__()[1], False, piece_type)
 
         # Uncomment these lines to print chains as lists of player names instead of lists of 1's and 2's:
         #whose = self.__whose_piece__()
@@ -194,93 +584,104 @@ class ConnectFourBoard :
         return ret
 
     def get_singleton_chains(self):
-        def has_twin_in_neighbors(col, row):
-            "returns True if piece has a neighbor of same type, else False"
-            piece_type = self.get_piece(col, row)
-            for x in [col-1, col, col+1]:
-                for y in [row-1, row, row+1]:
-                    if ((x, y) == (col, row) or x < 0 or y < 0
-                        or x >= self.num_cols or y >= self.num_rows):
-                        continue
-                    if self.get_piece(x, y) == piece_type:
-                        return True
-            return False
-
+        """Return a chain [piece_type] for every piece that has no neighbor of
+        the same type in any of the eight directions, in row-major order."""
+        return self.__get_singletons__()
+
+    def __get_singletons__(self, only_piece_type=None):
+        h = self.num_rows + 1
+        singletons = 0
+        for mask in self._masks:
+            # shifts that leave the board land on sentinel bits, which are never set
+            neighbors = 0
+            for shift in (1, h - 1, h, h + 1):
+                neighbors |= (mask << shift) | (mask >> shift)
+            singletons |= mask & ~neighbors
+        if not singletons:
+            return []
+        mask1 = self._masks[0]
         singleton_chains = []
-        for row_index in range(self.num_rows):
-            for col_index in range(self.num_cols):
-                piece_type = self.get_piece(col_index, row_index)
-                if piece_type is None or has_twin_in_neighbors(col_index, row_index):
-                    continue
-                singleton_chains.append([piece_type])
+        for index in self.__chain_lines__()[2]:
+            if (singletons >> index) & 1:
+                piece_type = 1 if (mask1 >> index) & 1 else 2
+                if only_piece_type is None or piece_type == only_piece_type:
+                    singleton_chains.append([piece_type])
         return singleton_chains
 
     def get_horizontal_chains(self, includeSingletons=False):
-        return self.__get_non_diagonal_chains__(1, 0, includeSingletons) # horizontal rightward
+        return self.__get_runs__(self.__chain_lines__()[0]['horizontal'], includeSingletons)
 
     def get_vertical_chains(self, includeSingletons=False):
-        return self.__get_non_diagonal_chains__(0, 1, includeSingletons) #vertical downward
-
-    def __get_non_diagonal_chains__(self, dx, dy, includeSingletons=False):
-        "Get all chains in a particular direction, horizontal or vertical."
-        ret = []
-        if dx > 0 :
-            # Iterate over all rows
-            for r in range(ConnectFourBoard.num_rows):
-                ret += self.__break_apart_line__(self.__get_line__(0, r, dx, dy))
-        if dx <= 0 :
-            # Iterate over all cols
-            for c in range(ConnectFourBoard.num_cols):
-                ret += self.__break_apart_line__(self.__get_line__(c, 0, dx, dy))
-        return [x for x in ret if includeSingletons or len(x) > 1]
-
-    def __break_apart_line__(self, line) :
-        """Given a line of pieces as returned by __get_line__, return a list of
-        the maximal contiguous subsequences.  For example:
-        [None, 1, None, 1, 1, 2, 2, 2] returns [[1],[1,1],[2,2,2]]."""
-        ret = []
-        current_chain = []
-
-        while line :
-            x = line.pop(0)
-            if x is None or (current_chain and current_chain[0] != x) :
-                if current_chain :
-                    ret.append(current_chain)
-                current_chain = []
-            if x is not None and (not current_chain or current_chain[0] == x) :
-                current_chain.append(x)
-        else :
-            if current_chain :
-                ret.append(current_chain)
-        return ret
+        return self.__get_runs__(self.__chain_lines__()[0]['vertical'], includeSingletons)
 
     def get_northeast_chains(self, includeSingletons=False):
-        return self.__get_diagonal_chains__(+1, -1, includeSingletons)
+        return self.__get_runs__(self.__chain_lines__()[0]['northeast'], includeSingletons)
 
     def get_northwest_chains(self, includeSingletons=False):
-        return self.__get_diagonal_chains__(-1, -1, includeSingletons)
-
-    def __get_diagonal_chains__(self, dx, dy=-1, includeSingletons=False):
-        indexes = self.__get_diagonal_indexes__(dx, dy, includeSingletons)
-        chains =  [[self.get_piece(col_row[0], col_row[1]) for col_row in chain] for chain in [x for x in indexes if x]]
-        chains = reduce(lambda a,b: a+b, list(map(self.__break_apart_line__, chains)))
-        chains = [chain for chain in chains if includeSingletons or len(chain) > 1]
-        return chains
+        return self.__get_runs__(self.__chain_lines__()[0]['northwest'], includeSingletons)
+
+    def __get_runs__(self, lines, includeSingletons=False, only_piece_type=None):
+        """Return the maximal runs of identical pieces along lines of bit
+        indexes, in order, as chains. Single pieces are only included if
+        includeSingletons is True; if only_piece_type is given, runs of the
+        other piece type are skipped."""
+        mask1, mask2 = self._masks
+        min_length = 1 if includeSingletons else 2
+        ret = []
+        for line in lines:
+            run_piece, run_length = None, 0
+            for index in line:
+                piece = 1 if (mask1 >> index) & 1 else 2 if (mask2 >> index) & 1 else None
+                if piece is not None and piece == run_piece:
+                    run_length += 1
+                    continue
+                if run_length >= min_length and only_piece_type in (None, run_piece):
+                    ret.append([run_piece] * run_length)
+                run_piece, run_length = piece, (piece is not None)
+            if run_length >= min_length and only_piece_type in (None, run_piece):
+                ret.append([run_piece] * run_length)
+        return ret
 
-    def __get_diagonal_indexes__(self, dx, dy=-1, includeSingletons=False):
-        indexes = []
+    def __chain_lines__(self):
+        """Return the lines that chains are read along, built once per board
+        geometry, as a tuple of:
+         0. a dict from direction ('horizontal', 'vertical', 'northeast',
+            'northwest') to its lines, each a list of bit indexes,
+         1. all of those lines in that order, as one list, and
+         2. the bit indexes of all cells in row-major order."""
+        geometry = (self.num_rows, self.num_cols)
+        if geometry not in CHAIN_LINES :
+            h, top = self.num_rows + 1, self.num_rows - 1
+            by_direction = {}
+            for direction, starts, dx, dy in [
+                    ('horizontal', [(0, r) for r in range(self.num_rows)], 1, 0),
+                    ('vertical', [(c, 0) for c in range(self.num_cols)], 0, 1),
+                    ('northeast', self.__get_diagonal_starts__(+1), +1, -1),
+                    ('northwest', self.__get_diagonal_starts__(-1), -1, -1)]:
+                by_direction[direction] = [[c * h + top - r for (c, r) in
+                                            self.__make_index_list__(col, row, dx, dy)]
+                                           for (col, row) in starts]
+            all_lines = [line for direction in ('horizontal', 'vertical', 'northeast', 'northwest')
+                         for line in by_direction[direction] if line]
+            cells = [c * h + top - r for r in range(self.num_rows) for c in range(self.num_cols)]
+            CHAIN_LINES[geometry] = (by_direction, all_lines, cells)
+        return CHAIN_LINES[geometry]
+
+    def __get_diagonal_starts__(self, dx):
+        "Return the (col, row) starting cells of the diagonals in direction dx, -1."
+        starts = []
 
         # north half of board
         col_start = 0 if dx>0 else self.num_cols - 1
         for row_start in range(self.num_rows - 1): # -1 to avoid double counting longest diagonal
-            indexes.append(self.__make_index_list__(col_start, row_start, dx, dy))
+            starts.append((col_start, row_start))
 
         # south half of board
         row_start = self.num_rows - 1
         for col_start in range(self.num_cols): # including longest diagonal
-            indexes.append(self.__make_index_list__(col_start, row_start, dx, dy))
+            starts.append((col_start, row_start))
 
-        return indexes
+        return starts
 
     def __make_index_list__(self, col_start, row_start, dx, dy):
         ilist = []
@@ -293,7 +694,7 @@ class ConnectFourBoard :
 
     def __piece_type__(self, player=None) :
         player = player or self.whose_turn
-        num_pieces = len([x for x in reduce(lambda a,b:a+b, self.board_array) if bool(x)])
+        num_pieces = self._counts[0] + self._counts[1]
         return [1,2][((player != self.whose_turn) + num_pieces) % 2]
 
     def __whose_piece__(self) :
@@ -304,12 +705,52 @@ class ConnectFourBoard :
         """Given two ConnectFourBoard objects, returns True if they have pieces in
         the same places (that is, same .board_array attribute), otherwise False."""
         return (is_class_instance(other, 'ConnectFourBoard')
-                and (self.board_array == other.board_array))
+                and (self._masks == other._masks))
+
+    def __hash__(self):
+        """Zobrist hash of the piece positions, updated incrementally as pieces
+        are added or undone. Boards that are __eq__ have equal hashes. Don't
+        play() or undo() on a board while it is being used as a dict key."""
+        return self._zobrist
+
+    def mirror(self) :
+        """Return the left-right mirror image of this board, as a new board
+        with the same players and turn."""
+        new_board = self.__class__([row[::-1] for row in self.board_array],
+                                   self.players, self.whose_turn)
+        if isinstance(self._prev_move, tuple) :
+            player, col_number = self._prev_move
+            new_board._prev_move = (player, self.mirror_column(col_number))
+        else :
+            new_board._prev_move = self._prev_move
+        return new_board
+
+    def mirror_column(self, col_number) :
+        "Return the column that col_number becomes when the board is mirrored."
+        return self.num_cols - 1 - col_number
+
+    def get_canonical_key(self) :
+        """Return the smaller of the board's hash and its mirror image's hash,
+        so that a position and its mirror image share one key. Like the hash,
+        it is kept up to date as pieces are added or undone."""
+        return min(self._zobrist, self._mirror_zobrist)
+
+    def is_canonical_mirrored(self) :
+        """Return True if get_canonical_key is the hash of the mirror image,
+        in which case moves must be mirrored to and from the canonical
+        orientation (see canonical_column)."""
+        return self._mirror_zobrist < self._zobrist
+
+    def canonical_column(self, col_number) :
+        """Map a column of this board to the same column of the canonical
+        orientation, or back: mirroring is its own inverse."""
+        return self.mirror_column(col_number) if self.is_canonical_mirrored() else col_number
 
     def __eq__(self, other):
         return (is_class_instance(other, 'ConnectFourBoard')
-                and (self.board_array == other.board_array)
-                and (self.prev_move_string == other.prev_move_string)
+                and (self._masks == other._masks)
+                and (self._prev_move == other._prev_move
+                     or self.prev_move_string == other.prev_move_string)
                 and (self.players == other.players)
                 and (self.whose_turn == other.whose_turn))
 
@@ -324,23 +765,27 @@ class AnytimeValue :
     def __init__(self, val=None) :
         self.value = val
         self.history = []
+        self.info = []  # for each entry of history, a dict of search statistics
         self.total_evaluations = 0
         if val is not None:
             self.set_value(val)
-    def set_value(self, val):
+    def set_value(self, val, info=None):
         if not is_dfs_return_type(val):
             raise TypeError('AnytimeValue.set_value expected tuple (path, '
                             +'score, number of evaluations)')
         self.value = val
         self.history.append(val)
+        self.info.append(info or {})
         self.total_evaluations += val[2]
     def get_value(self) :
         return self.value
     def pretty_print(self):
         print('*** Begin printing AnytimeValue history ***\n')
-        for val in self.history:
+        for val, info in zip(self.history, self.info):
             print('\nProgressive deepening to depth ' + str(len(val[0])-1) + ':')
             pretty_print_dfs_type(val)
+            if info:
+                print('Search statistics:', info)
         print('*** Done printing AnytimeValue history ***\n')
         print('Total number of static evaluations:', self.total_evaluations, '\n')
     def __str__(self):
@@ -350,6 +795,301 @@ class AnytimeValue :
     def copy(self):
         return deepcopy(self)
 
+TableEntry = namedtuple('TableEntry', ['depth', 'score', 'bound', 'best_move', 'path'])
+
+class TranspositionTable :
+    """A bounded table of search results keyed by position hash. Each entry
+    records the depth searched, the score, whether the score is exact or only
+    a lower/upper bound, the best move, and the move keys of the best path
+    (as the searchers in lab2 link them: nested (move, rest) pairs ending in
+    (), or None if no move improved on the window).
+
+    At most capacity entries are kept; when the table is full, the least
+    recently used entry is evicted. With replacement='depth', an existing
+    entry for a position is only overwritten by a search at least as deep;
+    with replacement='always', the newest result always wins.
+
+    If symmetric is True, a position and its mirror image share one entry,
+    keyed by the board's get_canonical_key, with the moves stored in the
+    canonical orientation. This only works for in-place searches, whose moves
+    are columns, and for heuristic and endgame score functions that score
+    mirror images the same.
+
+    A table is only meaningful for searches using the same heuristic and
+    endgame score functions."""
+    EXACT = 'exact'
+    LOWERBOUND = 'lowerbound'
+    UPPERBOUND = 'upperbound'
+
+    def __init__(self, capacity=1000000, replacement='depth', symmetric=False) :
+        if replacement not in ('always', 'depth') :
+            raise ValueError("Expected replacement 'always' or 'depth', got "
+                             + str(replacement))
+        if capacity < 1 :
+            raise ValueError("Transposition table capacity must be positive.")
+        self.capacity = capacity
+        self.replacement = replacement
+        self.symmetric = symmetric
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key) :
+        "Return the TableEntry stored for key, or None."
+        entry = self.entries.get(key)
+        if entry is None :
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key, depth, score, bound, best_move=None, path=None) :
+        "Record a search result for key, evicting old entries if necessary."
+        old = self.entries.get(key)
+        if old is not None and self.replacement == 'depth' and old.depth > depth :
+            return
+        self.entries[key] = TableEntry(depth, score, bound, best_move, path)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity :
+            self.entries.popitem(last=False)
+
+    def clear(self) :
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) :
+        return len(self.entries)
+
+    def __str__(self) :
+        return ("<TranspositionTable with %i of %i entries, %i hits, %i misses>"
+                % (len(self.entries), self.capacity, self.hits, self.misses))
+    __repr__ = __str__
+
+class MoveHistory :
+    """Killer moves and history scores, for ordering moves by the cutoffs they
+    caused elsewhere in the search. Moves are identified by any hashable id
+    that means the same move in different positions (such as a column).
+
+    For each ply (distance from the root), the killer_slots most recent moves
+    that caused a cutoff there are tried first, most recent first. The other
+    moves are tried in order of their history score, which grows by
+    depth*depth (or by 1 in searches without a depth limit) each time the
+    move causes a cutoff with depth plies left to search. Moves that never
+    caused a cutoff keep their original order.
+
+    Keep one MoveHistory across the iterations of progressive deepening, so
+    that each iteration is ordered by what the shallower ones learned."""
+
+    def __init__(self, killer_slots=2) :
+        if killer_slots < 0 :
+            raise ValueError("Number of killer slots can't be negative.")
+        self.killer_slots = killer_slots
+        self.killers = {}  # ply -> list of move ids, most recent first
+        self.history = {}  # move id -> score
+        self.cutoffs = 0
+
+    def record_cutoff(self, ply, move_id, depth) :
+        "Record that move_id caused a cutoff at ply with depth plies left."
+        self.cutoffs += 1
+        self.history[move_id] = (self.history.get(move_id, 0)
+                                 + (depth * depth if depth != float('inf') else 1))
+        if self.killer_slots :
+            killers = self.killers.setdefault(ply, [])
+            if move_id in killers :
+                killers.remove(move_id)
+            killers.insert(0, move_id)
+            del killers[self.killer_slots:]
+
+    def order(self, ply, moves, move_id=lambda move : move) :
+        """Return moves sorted for searching at ply: killers first, then by
+        decreasing history score. move_id gives the id of each move."""
+        killers = self.killers.get(ply, [])
+        def priority(move) :
+            key = move_id(move)
+            if key in killers :
+                return (0, killers.index(key))
+            return (1, -self.history.get(key, 0))
+        return sorted(moves, key=priority)
+
+    def clear(self) :
+        self.killers.clear()
+        self.history.clear()
+        self.cutoffs = 0
+
+    def __str__(self) :
+        return ("<MoveHistory with %i killer plies, %i moves with history, %i cutoffs>"
+                % (len(self.killers), len(self.history), self.cutoffs))
+    __repr__ = __str__
+
+class HeuristicCache :
+    """A heuristic_fn that remembers the scores of another one. Calling the
+    cache as heuristic_fn(board, maximize) returns the score stored for the
+    board's hash and the maximize flag, and only calls the wrapped heuristic
+    for boards it hasn't seen. The wrapped heuristic must depend only on the
+    position, and the boards must be hashable.
+
+    If symmetric is True, boards are keyed by their get_canonical_key, so a
+    position and its mirror image share one score. Only use this with
+    heuristics that score mirror images the same, like heuristic_connectfour.
+
+    At most capacity scores are kept; when the cache is full, the least
+    recently used one is evicted. Hits and misses are counted."""
+
+    def __init__(self, heuristic_fn, capacity=1000000, symmetric=False) :
+        if capacity < 1 :
+            raise ValueError("Heuristic cache capacity must be positive.")
+        self.heuristic_fn = heuristic_fn
+        self.capacity = capacity
+        self.symmetric = symmetric
+        self.scores = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, board, maximize=True) :
+        key = (board.get_canonical_key() if self.symmetric else hash(board), bool(maximize))
+        score = self.scores.get(key)
+        if score is not None or key in self.scores :
+            self.hits += 1
+            self.scores.move_to_end(key)
+            return score
+        self.misses += 1
+        score = self.scores[key] = self.heuristic_fn(board, maximize)
+        if len(self.scores) > self.capacity :
+            self.scores.popitem(last=False)
+        return score
+
+    def clear(self) :
+        self.scores.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) :
+        return len(self.scores)
+
+    def __str__(self) :
+        return ("<HeuristicCache with %i of %i scores, %i hits, %i misses>"
+                % (len(self.scores), self.capacity, self.hits, self.misses))
+    __repr__ = __str__
+
+#### Batch evaluation of ConnectFourBoards (requires NumPy) ####
+
+# (row, col) steps along horizontal, vertical, and both diagonal lines
+LINE_DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+def _require_numpy() :
+    if numpy is None :
+        raise ImportError("Batch evaluation of boards requires NumPy.")
+
+def pack_boards(boards) :
+    """Pack a list of ConnectFourBoards of the same size into a NumPy array of
+    shape (N, rows, cols), with 0 for empty cells and 1 or 2 for pieces, row 0
+    being the top row as in board_array. The boards are read straight from
+    their bitboards."""
+    _require_numpy()
+    if not boards :
+        return numpy.zeros((0, ConnectFourBoard.num_rows, ConnectFourBoard.num_cols), numpy.int8)
+    rows, cols = boards[0].num_rows, boards[0].num_cols
+    if any((board.num_rows, board.num_cols) != (rows, cols) for board in boards) :
+        raise ValueError("All boards in a batch must have the same size.")
+    length = (cols * (rows + 1) + 7) // 8
+    packed = numpy.zeros((len(boards), rows, cols), numpy.int8)
+    for piece_type in (1, 2) :
+        data = b''.join(board._masks[piece_type - 1].to_bytes(length, 'little') for board in boards)
+        bits = numpy.unpackbits(numpy.frombuffer(data, numpy.uint8), bitorder='little')
+        # each column takes rows+1 bits, bottom cell first, then the sentinel
+        bits = bits.reshape(len(boards), length * 8)[:, :cols * (rows + 1)]
+        cells = bits.reshape(len(boards), cols, rows + 1)[:, :, rows - 1::-1]
+        packed += piece_type * cells.transpose(0, 2, 1).astype(numpy.int8)
+    return packed
+
+def _shifted(pieces, dr, dc, steps) :
+    """Return pieces (a boolean array of shape (N, rows, cols)) moved by steps
+    cells against direction (dr, dc), so that each cell holds the value of the
+    cell steps further along the line, or False past the edge."""
+    rows, cols = pieces.shape[1:]
+    shifted = numpy.zeros_like(pieces)
+    r, c = steps * dr, steps * dc
+    if abs(r) >= rows or abs(c) >= cols :
+        return shifted
+    shifted[:, max(0, -r) : rows - max(0, r), max(0, -c) : cols - max(0, c)] = \
+        pieces[:, max(0, r) : rows - max(0, -r), max(0, c) : cols - max(0, -c)]
+    return shifted
+
+def _piece_mask(packed, piece_types) :
+    "Boolean array of the cells holding piece_types (one int, or one per board)."
+    piece_types = numpy.asarray(piece_types).reshape(-1, 1, 1)
+    return packed == piece_types
+
+def batch_current_piece_types(packed, current_player=True) :
+    """Return the piece type (1 or 2) of the current player (or the other
+    player, if current_player is False) of each packed board. As for a
+    ConnectFourBoard, player 1 moves when the number of pieces is even."""
+    _require_numpy()
+    parity = (numpy.count_nonzero(packed, axis=(1, 2)) + (not current_player)) % 2
+    return (1 + parity).astype(numpy.int8)
+
+def batch_column_heights(packed) :
+    """Return an (N, cols) array of the column heights of each packed board:
+    as for get_column_height, the number of pieces stacked without a gap
+    from the bottom of the column."""
+    _require_numpy()
+    occupied = packed[:, ::-1, :] != 0  # bottom row first
+    return numpy.cumprod(occupied, axis=1).sum(axis=1)
+
+def batch_has_four_in_a_row(packed) :
+    "Return a boolean array: whether each packed board has a chain of four or more."
+    _require_numpy()
+    found = numpy.zeros(len(packed), bool)
+    for piece_type in (1, 2) :
+        pieces = packed == piece_type
+        for dr, dc in LINE_DIRECTIONS :
+            four = pieces.copy()
+            for steps in (1, 2, 3) :
+                four &= _shifted(pieces, dr, dc, steps)
+            found |= four.any(axis=(1, 2))
+    return found
+
+def batch_chain_counts(packed, piece_types) :
+    """Return an (N, 3) array of [singletons, pairs, longer] chains of the given
+    piece types (one int, or one per board), counted as by get_all_chains."""
+    _require_numpy()
+    pieces = _piece_mask(packed, piece_types)
+    counts = numpy.zeros((len(packed), 3), numpy.int64)
+    neighbors = numpy.zeros_like(pieces)
+    for dr, dc in LINE_DIRECTIONS :
+        after, before = _shifted(pieces, dr, dc, 1), _shifted(pieces, -dr, -dc, 1)
+        neighbors |= after | before
+        # a run of two or more starts where a piece has a successor but no predecessor
+        starts = pieces & after & ~before
+        two_after = _shifted(pieces, dr, dc, 2)
+        counts[:, 1] += (starts & ~two_after).sum(axis=(1, 2))
+        counts[:, 2] += (starts & two_after).sum(axis=(1, 2))
+    counts[:, 0] = (pieces & ~neighbors).sum(axis=(1, 2))
+    return counts
+
+def batch_window_counts(packed, piece_types) :
+    """Return an (N, 5) array whose k-th column is the number of windows
+    holding k pieces of the given piece types (one int, or one per board) and
+    none of the other player's, as by get_window_counts."""
+    _require_numpy()
+    pieces = _piece_mask(packed, piece_types)
+    others = (packed != 0) & ~pieces
+    rows, cols = packed.shape[1:]
+    counts = numpy.zeros((len(packed), 5), numpy.int64)
+    for dr, dc in LINE_DIRECTIONS :
+        # windows are named by their first cell; only some first cells fit
+        fits = numpy.zeros((rows, cols), bool)
+        for r in range(rows) :
+            for c in range(cols) :
+                fits[r, c] = 0 <= r + 3*dr < rows and 0 <= c + 3*dc < cols
+        own = sum(_shifted(pieces, dr, dc, steps).astype(numpy.int8) for steps in range(4))
+        blocked = reduce(numpy.logical_or, [_shifted(others, dr, dc, steps) for steps in range(4)])
+        for k in range(5) :
+            counts[:, k] += ((own == k) & ~blocked & fits).sum(axis=(1, 2))
+    return counts
+
 def is_class_instance(obj, class_name):
     return hasattr(obj, '__class__') and obj.__class__.__name__ == class_name
 
@@ -4,6 +4,13 @@
 from game_api import *
 from boards import *
 from toytree import GAME1
+import math
+import os
+import struct
+from itertools import islice
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import Manager
 
 INF = float('inf')
 
@@ -14,11 +21,9 @@ INF = float('inf')
 def is_game_over_connectfour(board):
     """Returns True if game is over, otherwise False."""
     
-    # Check if there's a chain greater than 4
-    chains = board.get_all_chains()
-    for chain in chains:
-        if len(chain) >= 4:
-            return True
+    # Check if there's a chain of 4 or more
+    if board.has_four_in_a_row():
+        return True
 
     # Check if columns are filled
     filled = []
@@ -30,34 +35,46 @@ def is_game_over_connectfour(board):
 
     return False
 
-def next_boards_connectfour(board):
+def next_boards_connectfour(board, move_order=None):
     """Returns a list of ConnectFourBoard objects that could result from the
-    next move, or an empty list if no moves can be made."""
+    next move, or an empty list if no moves can be made.
+
+    The boards are in column order, unless a move_order function is given:
+    move_order(board, columns) returns the open columns in the order to
+    play them, e.g. order_columns_center_out."""
+    return list(iter_next_boards_connectfour(board, move_order))
+
+def iter_next_boards_connectfour(board, move_order=None):
+    """Generator version of next_boards_connectfour: yields the same boards,
+    in the same order, building each one only when it is asked for.  Use it
+    as a generate_next_states_fn so that pruned children are never built."""
     
     # Check if game over
     if is_game_over_connectfour(board):
-        return []
+        return
 
     # Iterate through columns
-    next_boards = []
-    for col in range(board.num_cols):
-        if not board.is_column_full(col):
-            next_boards.append(board.add_piece(col))
+    columns = [col for col in range(board.num_cols) if not board.is_column_full(col)]
+    if move_order is not None:
+        columns = move_order(board, columns)
+    for col in columns:
+        yield board.add_piece(col)
 
-    return next_boards
+def order_columns_center_out(board, columns):
+    """Move ordering that plays the center columns first, since they take part
+    in the most lines of four: 3, 2, 4, 1, 5, 0, 6 on an empty board."""
+    return sorted(columns, key=lambda col: (abs(2*col - (board.num_cols - 1)), col))
 
 def endgame_score_connectfour(board, is_current_player_maximizer):
     """Given an endgame board, returns 1000 if the maximizer has won,
     -1000 if the minimizer has won, or 0 in case of a tie."""
     
     # Check if there's a chain of 4
-    chains = board.get_all_chains()
-    for chain in chains:
-        if len(chain) >= 4:
-            if is_current_player_maximizer:
-                return -1000
-            else:
-                return 1000
+    if board.has_four_in_a_row():
+        if is_current_player_maximizer:
+            return -1000
+        else:
+            return 1000
     # tie otherwise
     return 0
 
@@ -71,14 +88,12 @@ def endgame_score_connectfour_faster(board, is_current_player_maximizer):
     used_pieces = board.count_pieces()
 
     # Check if there's a chain of 4
-    chains = board.get_all_chains()
-    for chain in chains:
-        if len(chain) >= 4:
-            score = max_score - used_pieces*100
-            if is_current_player_maximizer:
-                return (-1*score)
-            else:
-                return score
+    if board.has_four_in_a_row():
+        score = max_score - used_pieces*100
+        if is_current_player_maximizer:
+            return (-1*score)
+        else:
+            return score
     # tie otherwise
     return 0
 
@@ -88,8 +103,10 @@ def heuristic_connectfour(board, is_current_player_maximizer):
     abs(score) < 1000, where higher numbers indicate that the board is better
     for the maximizer."""
 
-    current_player_chain = board.get_all_chains(current_player=True)
-    other_player_chain = board.get_all_chains(current_player=False)
+    # [singletons, pairs, longer] chains of each player, which the board
+    # keeps up to date as pieces are added once it has been asked for them
+    current_player_chain = board.get_chain_counts(current_player=True)
+    other_player_chain = board.get_chain_counts(current_player=False)
 
     """
     Score algorithm:
@@ -99,18 +116,9 @@ def heuristic_connectfour(board, is_current_player_maximizer):
     
     Compare raw score between players
     """
-    def score(chains):
-        score = 0
-        conversion = {
-        4: 100,
-        3: 100,
-        2: 50,
-        1: 25,
-        0: 0
-        }
-        for chain in chains:
-            score += conversion[len(chain)]
-        return score
+    def score(chain_counts):
+        singletons, pairs, longer = chain_counts
+        return 25*singletons + 50*pairs + 100*longer
 
     heuristic = score(current_player_chain) - score(other_player_chain)
     if is_current_player_maximizer:
@@ -119,6 +127,27 @@ def heuristic_connectfour(board, is_current_player_maximizer):
         return -1*heuristic
 
 
+def is_game_over_connectfour_batch(boards):
+    """Batch version of is_game_over_connectfour for a list of boards, using
+    NumPy. Returns a boolean NumPy array."""
+    packed = pack_boards(boards)
+    filled = (batch_column_heights(packed) == packed.shape[1]).all(axis=1)
+    return batch_has_four_in_a_row(packed) | filled
+
+def heuristic_connectfour_batch(boards, is_current_player_maximizer):
+    """Batch version of heuristic_connectfour for a list of non-endgame
+    boards, using NumPy. Returns a NumPy array of the same scores."""
+    packed = pack_boards(boards)
+    weights = [25, 50, 100]  # singletons, pairs, longer chains
+    current = batch_chain_counts(packed, batch_current_piece_types(packed, True)) @ weights
+    other = batch_chain_counts(packed, batch_current_piece_types(packed, False)) @ weights
+    heuristic = current - other
+    if is_current_player_maximizer:
+        return heuristic
+    else:
+        return -1*heuristic
+
+
 # Now we can create AbstractGameState objects for Connect Four, using some of
 # the functions you implemented above.  You can use the following examples to
 # test your dfs and minimax implementations in Part 2.
@@ -126,19 +155,19 @@ def heuristic_connectfour(board, is_current_player_maximizer):
 # This AbstractGameState represents a new ConnectFourBoard, before the game has started:
 state_starting_connectfour = AbstractGameState(snapshot = ConnectFourBoard(),
                                  is_game_over_fn = is_game_over_connectfour,
-                                 generate_next_states_fn = next_boards_connectfour,
+                                 generate_next_states_fn = iter_next_boards_connectfour,
                                  endgame_score_fn = endgame_score_connectfour_faster)
 
 # This AbstractGameState represents the ConnectFourBoard "NEARLY_OVER" from boards.py:
 state_NEARLY_OVER = AbstractGameState(snapshot = NEARLY_OVER,
                                  is_game_over_fn = is_game_over_connectfour,
-                                 generate_next_states_fn = next_boards_connectfour,
+                                 generate_next_states_fn = iter_next_boards_connectfour,
                                  endgame_score_fn = endgame_score_connectfour_faster)
 
 # This AbstractGameState represents the ConnectFourBoard "BOARD_UHOH" from boards.py:
 state_UHOH = AbstractGameState(snapshot = BOARD_UHOH,
                                  is_game_over_fn = is_game_over_connectfour,
-                                 generate_next_states_fn = next_boards_connectfour,
+                                 generate_next_states_fn = iter_next_boards_connectfour,
                                  endgame_score_fn = endgame_score_connectfour_faster)
 
 
@@ -197,9 +226,19 @@ def minimax_endgame_search(state, maximize=True) :
 # pretty_print_dfs_type(minimax_endgame_search(state_NEARLY_OVER))
 
 
-def minimax_search(state, heuristic_fn=always_zero, depth_limit=INF, maximize=True) :
-    """Performs standard minimax search. Same return type as dfs_maximizing."""
+def minimax_search(state, heuristic_fn=always_zero, depth_limit=INF, maximize=True,
+                   batch_heuristic_fn=None) :
+    """Performs standard minimax search. Same return type as dfs_maximizing.
+
+    If a batch_heuristic_fn is given, it is used instead of heuristic_fn:
+    the tree is first expanded to the depth limit, then all the boards at
+    the limit are scored with a single call batch_heuristic_fn(boards,
+    is_current_player_maximizer) (e.g. heuristic_connectfour_batch), and the
+    scores are backed up as usual. The result is the same as with the
+    matching heuristic_fn."""
     # https://piazza.com/class/kdyp7ljiti778l?cid=271
+    if batch_heuristic_fn is not None:
+        return _minimax_search_batched(state, batch_heuristic_fn, depth_limit, maximize)
 
     # base case: end state
     if state.is_game_over():
@@ -229,48 +268,42 @@ def minimax_search(state, heuristic_fn=always_zero, depth_limit=INF, maximize=Tr
 
 
 def minimax_search_alphabeta(state, alpha=-INF, beta=INF, heuristic_fn=always_zero,
-                             depth_limit=INF, maximize=True) :
+                             depth_limit=INF, maximize=True, in_place=False,
+                             transposition_table=None, move_order=None,
+                             move_history=None, pvs=False) :
     """"Performs minimax with alpha-beta pruning. Same return type 
-    as dfs_maximizing."""
-    # Score becomes alpha or beta and is used to do comparsions
-    # https://piazza.com/class/kdyp7ljiti778l?cid=378
-    # Double check tree logic 
+    as dfs_maximizing.
 
-    # base case: end state
-    if state.is_game_over():
-        return([state], state.get_endgame_score(maximize), 1)
-    elif depth_limit == 0:
-        return([state], heuristic_fn(state.get_snapshot(), maximize), 1)
-    else:
-        next_states = state.generate_next_states()
-        n = len(next_states)
+    If in_place is True, the search plays and undoes moves on a single copy
+    of the ConnectFourBoard snapshot instead of creating a new board per
+    child; only the boards on the returned path are built.
 
+    If a TranspositionTable is given, positions already searched to at least
+    the remaining depth are answered from the table, and cost no static
+    evaluations. The snapshots must be hashable.
 
-        if maximize:
-            eval_count = 0
-            path = []
-            for s in next_states:
-                child = minimax_search_alphabeta(s, alpha, beta, heuristic_fn, depth_limit-1, not maximize)
-                eval_count += child[2]
-                if (child[1] > alpha):
-                    path = [state] + child[0]
-                alpha = max(alpha, child[1])
-                if alpha >= beta:
-                    break 
-            return(path, alpha, eval_count)
-        else:
-            eval_count = 0
-            path = []
-            for s in next_states:
-                child = minimax_search_alphabeta(s, alpha, beta, heuristic_fn, depth_limit-1, not maximize)
-                eval_count += child[2]
-                if (child[1] < beta):
-                    path = [state] + child[0]
-                beta = min(beta, child[1])
-                if alpha >= beta:
-                    break 
-            return(path, beta, eval_count)
+    If a move_order function is given (see next_boards_connectfour), children
+    are searched in that order, e.g. order_columns_center_out, which prunes
+    far more in Connect Four. The score is unchanged; among equally good
+    moves, the path may differ.
+
+    A MoveHistory reorders children by the killer moves and history scores
+    of the cutoffs found so far (in this search and any earlier ones that
+    used the same MoveHistory).
+
+    If pvs is True, runs principal variation search (NegaScout): every
+    child after the first is only scouted with a null window, and searched
+    fully if it turns out to be better. With good move ordering this needs
+    fewer evaluations; the score is the same as without it."""
+    # Score becomes alpha or beta and is used to do comparsions
+    # https://piazza.com/class/kdyp7ljiti778l?cid=378
+    # Double check tree logic 
 
+    search = _SearchContext(state, heuristic_fn, in_place, transposition_table,
+                            move_order, move_history, pvs)
+    moves, score, eval_count = _alphabeta(search, search.root, alpha, beta,
+                                          depth_limit, maximize)
+    return (search.build_path(moves), score, eval_count)
 
 
 # Uncomment the line below to try minimax_search_alphabeta with "BOARD_UHOH" and
@@ -281,21 +314,72 @@ def minimax_search_alphabeta(state, alpha=-INF, beta=INF, heuristic_fn=always_ze
 
 
 def progressive_deepening(state, heuristic_fn=always_zero, depth_limit=INF,
-                          maximize=True) :
+                          maximize=True, in_place=False, reuse_pv=False,
+                          transposition_table=None, time_limit=None, move_order=None,
+                          move_history=None, pvs=False, aspiration_window=None) :
     """Runs minimax with alpha-beta pruning. At each level, updates anytime_value
-    with the tuple returned from minimax_search_alphabeta. Returns anytime_value."""
+    with the tuple returned from minimax_search_alphabeta. Returns anytime_value.
+
+    in_place, transposition_table, move_order, move_history and pvs are as
+    for minimax_search_alphabeta; a table or history is shared by all
+    iterations, so the best moves found at one depth are tried first at the
+    next. If reuse_pv is True, each iteration first searches the best path
+    found by the previous one.
+
+    If time_limit (in seconds) is given, deepening stops when the time is
+    spent: the iteration in progress is abandoned and anytime_value holds the
+    last completed depth. The first iteration always runs to completion.
+    With a time_limit or no depth_limit, deepening also stops once the game
+    is solved: when an iteration never stopped at its depth limit, or (for
+    boards) the depth exceeds the number of empty cells, deeper iterations
+    would only repeat it.
+
+    If aspiration_window is given, each iteration after the first searches
+    the window previous score +/- aspiration_window. When the score falls
+    outside it, the failing side is widened (to twice the width, then all the
+    way) and the depth is searched again. The numbers of re-searches are
+    recorded in anytime_value.info as 'fail_low' and 'fail_high', and their
+    evaluations are counted."""
     """
     Algorithm: minimax at each depth return that before going next level, start from same node
     https://piazza.com/class/kdyp7ljiti778l?cid=323
     """
 
     value = AnytimeValue()
+    search = _SearchContext(state, heuristic_fn, in_place, transposition_table,
+                            move_order, move_history, pvs)
+    principal_variation = ()
+    start_time = time.monotonic()
  
+    stop_when_solved = time_limit is not None or depth_limit == INF
+    snapshot = state.get_snapshot()
+    if hasattr(snapshot, 'count_pieces'):
+        empty_cells = snapshot.num_rows * snapshot.num_cols - snapshot.count_pieces()
+    else:
+        empty_cells = INF
+
     # iterate through the levels
     depth = 1
     while depth <= depth_limit:
-        next_level = minimax_search_alphabeta(state, depth_limit=depth, heuristic_fn=heuristic_fn, maximize=maximize)
-        value.set_value(next_level)
+        if time_limit is not None and depth > 1:
+            search.deadline = start_time + time_limit
+        search.reached_horizon = False
+        try:
+            if aspiration_window is None:
+                moves, score, eval_count = _alphabeta(search, search.root, -INF, INF, depth,
+                                                      maximize, principal_variation)
+                info = None
+            else:
+                guess = value.get_value()[1] if depth > 1 else None
+                moves, score, eval_count, info = _aspiration_search(
+                    search, depth, maximize, principal_variation, guess, aspiration_window)
+        except SearchTimeout:
+            break
+        value.set_value((search.build_path(moves), score, eval_count), info)
+        if reuse_pv and moves:
+            principal_variation = tuple(moves)
+        if stop_when_solved and (not search.reached_horizon or depth >= empty_cells):
+            break
         depth += 1
 
     return value
@@ -320,6 +404,624 @@ if not TEST_PROGRESSIVE_DEEPENING:
     progressive_deepening = not_implemented
 
 
+def mtdf(state, heuristic_fn=always_zero, depth_limit=INF, maximize=True,
+         first_guess=0, in_place=False, transposition_table=None, move_order=None,
+         move_history=None) :
+    """Iterative deepening with MTD(f). At each depth, repeats null-window
+    alpha-beta searches, each testing whether the score is above a guess,
+    until the bounds they return meet at the minimax score. The first guess
+    is first_guess at depth 1, then the score of the previous depth.
+
+    The searches share a transposition table (a new one if none is given),
+    which answers most of each pass from the previous ones, so the snapshots
+    must be hashable. Once the score is known, one more search with a window
+    just around it finds the best path.
+
+    Returns an AnytimeValue like progressive_deepening's, whose info records
+    the number of null-window passes at each depth under 'passes'. in_place,
+    move_order and move_history are as for minimax_search_alphabeta."""
+    value = AnytimeValue()
+    if transposition_table is None:
+        transposition_table = TranspositionTable()
+    search = _SearchContext(state, heuristic_fn, in_place, transposition_table,
+                            move_order, move_history)
+    search.fail_soft = True
+    guess = first_guess
+
+    depth = 1
+    while depth <= depth_limit:
+        lower, upper = -INF, INF
+        passes = eval_count = 0
+        while lower < upper:
+            # test whether the score is at least beta
+            beta = guess if guess > lower else _nextafter(lower, INF)
+            moves, guess, evals = _alphabeta(search, search.root, _nextafter(beta, -INF),
+                                             beta, depth, maximize)
+            passes += 1
+            eval_count += evals
+            if guess < beta:
+                upper = guess
+            else:
+                lower = guess
+        moves, score, evals = _alphabeta(search, search.root, _nextafter(guess, -INF),
+                                         _nextafter(guess, INF), depth, maximize)
+        value.set_value((search.build_path(moves), score, eval_count + evals),
+                        {'passes': passes})
+        depth += 1
+
+    return value
+
+
+#### Search engine ############################################################
+
+# minimax_search_alphabeta and the searchers built on it walk the game tree
+# through a _SearchContext.  A context either creates a new AbstractGameState
+# per child, or plays and undoes moves on one ConnectFourBoard (in_place).
+# Either way, a move is identified by a key -- the child's index (as in
+# move_sequence) for states, or the column for in-place boards -- and searches
+# return the keys of the best path, which build_path turns into states.
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its deadline has passed."""
+    pass
+
+
+def _nextafter(x, toward) :
+    """The next float after x in the direction of toward, like
+    math.nextafter, which only exists from Python 3.9 on. Null-window
+    searches use it to get the narrowest window above or below a score."""
+    if hasattr(math, 'nextafter'):
+        return math.nextafter(x, toward)
+    x = float(x)
+    if x == toward:
+        return toward
+    if x != x or toward != toward:
+        return x + toward  # NaN
+    if x == 0:
+        return math.copysign(5e-324, toward)  # the smallest subnormal float
+    bits = struct.unpack('<Q', struct.pack('<d', x))[0]
+    # the bits (less the sign) count up with the float's magnitude
+    bits += 1 if (toward > x) == (x > 0) else -1
+    return struct.unpack('<d', struct.pack('<Q', bits))[0]
+
+
+class _SearchContext :
+    """Everything a search needs besides the current node and window."""
+
+    def __init__(self, state, heuristic_fn=always_zero, in_place=False,
+                 transposition_table=None, move_order=None, move_history=None,
+                 pvs=False) :
+        self.state = state
+        self.heuristic_fn = heuristic_fn
+        self.in_place = in_place
+        self.transposition_table = transposition_table
+        self.move_order = move_order
+        self.move_history = move_history
+        self.pvs = pvs  # whether to scout all but the first child with a null window
+        self.fail_soft = False  # whether scores may fall outside the window
+        self.deadline = None  # time.monotonic() value at which to give up
+        self.reached_horizon = False  # whether a node was cut off by the depth limit
+        self.shared_bound = None  # a parallel search's root bound, see tighten()
+        if in_place :
+            board = state.get_snapshot()
+            if not (hasattr(board, 'play') and hasattr(board, 'undo')) :
+                raise TypeError("In-place search requires a snapshot with play() "
+                                + "and undo(), such as a ConnectFourBoard.")
+            self.root = board.copy()
+        else :
+            self.root = state
+        # a symmetric table shares entries between mirror images, so the moves
+        # it stores must be columns that can be mirrored
+        self.symmetric_table = transposition_table is not None and transposition_table.symmetric
+        if self.symmetric_table and not in_place :
+            raise ValueError("A symmetric TranspositionTable requires an in-place search.")
+
+    def share_bound(self, shared_bound, is_alpha, poll_interval=64) :
+        """Have the search tighten its windows with the value of shared_bound
+        (anything with a .value), which another process raises (if is_alpha)
+        or lowers as it learns a better bound for the whole search. The value
+        is read once every poll_interval nodes."""
+        self.shared_bound = shared_bound
+        self.bound_is_alpha = is_alpha
+        self.poll_interval = poll_interval
+        self.polls_left = 0
+        self.bound = -INF if is_alpha else INF
+
+    def tighten(self, alpha, beta) :
+        """Return the window (alpha, beta) narrowed by the shared bound. The
+        search stays correct above (or below) the bound; scores at or beyond
+        it only mean the subtree is no better than what is already known."""
+        self.polls_left -= 1
+        if self.polls_left <= 0:
+            self.polls_left = self.poll_interval
+            self.bound = self.shared_bound.value
+        if self.bound_is_alpha:
+            return (max(alpha, self.bound), beta)
+        return (alpha, min(beta, self.bound))
+
+    def is_game_over(self, node) :
+        if not self.in_place :
+            return node.is_game_over()
+        return (self.state.is_game_over_fn(node)
+                or all(node.is_column_full(col) for col in range(node.num_cols)))
+
+    def endgame_score(self, node, maximize) :
+        if not self.in_place :
+            return node.get_endgame_score(maximize)
+        return self.state.endgame_score_fn(node, maximize)
+
+    def heuristic(self, node, maximize) :
+        snapshot = node if self.in_place else node.get_snapshot()
+        return self.heuristic_fn(snapshot, maximize)
+
+    def moves(self, node, first=None, ply=0) :
+        """Return the (key, child) moves available from a node, in move_order
+        if there is one, then by the move_history at ply (if any), with the
+        move whose key is first (if any) moved to the front.  For in-place
+        boards the child is only produced by make().  Unless they need
+        reordering, child states are built lazily, as the search reaches them."""
+        if not self.in_place :
+            if first is None and self.move_order is None and self.move_history is None :
+                return enumerate(node.iter_next_states())
+            moves = list(enumerate(node.iter_next_states()))
+        else :
+            moves = [(col, None) for col in range(node.num_cols)
+                     if not node.is_column_full(col)]
+        if self.move_order is not None :
+            moves = self.order_moves(node, moves)
+        if self.move_history is not None :
+            moves = self.move_history.order(ply, moves, self.move_id)
+        if first is not None :
+            for i, move in enumerate(moves) :
+                if move[0] == first :
+                    moves.insert(0, moves.pop(i))
+                    break
+        return moves
+
+    def order_moves(self, node, moves) :
+        """Sort moves by move_order, which is given the ConnectFourBoard and
+        the column of each move."""
+        board = node if self.in_place else node.get_snapshot()
+        by_column = dict((self.move_id(move), move) for move in moves)
+        return [by_column[col] for col in self.move_order(board, list(by_column))]
+
+    def move_id(self, move) :
+        """Identify a move the same way in every position: by its column in
+        Connect Four, otherwise by its key (the index of the child)."""
+        if self.in_place :
+            return move[0]
+        snapshot = move[1].get_snapshot()
+        if hasattr(snapshot, 'get_last_move') and snapshot.get_last_move() is not None :
+            return snapshot.get_last_move()[0]
+        return move[0]
+
+    def make(self, node, move) :
+        return node.play(move[0]) if self.in_place else move[1]
+
+    def unmake(self, node) :
+        if self.in_place :
+            node.undo()
+
+    def table_key(self, node, maximize) :
+        """Key for a node in the transposition table. Move keys differ between
+        the two walking modes, so their entries are kept apart."""
+        if self.symmetric_table :
+            return (node.get_canonical_key(), maximize, self.in_place)
+        return (hash(node), maximize, self.in_place)
+
+    def table_move(self, node, move) :
+        """Map the key of a move from node to or from the orientation stored in
+        a symmetric transposition table (mirroring is its own inverse)."""
+        if move is None or not self.symmetric_table :
+            return move
+        return node.canonical_column(move)
+
+    def table_path(self, node, links) :
+        """Map a path of linked move keys below node to or from the orientation
+        stored in a symmetric transposition table."""
+        if not links or not self.symmetric_table or not node.is_canonical_mirrored() :
+            return links
+        mirrored = ()
+        for col in reversed(_unlink(links)) :
+            mirrored = (node.mirror_column(col), mirrored)
+        return mirrored
+
+    def build_path(self, moves) :
+        """Turn the move keys returned by a search into a list of states."""
+        if moves is None :
+            return []
+        path = [self.state]
+        for move in moves :
+            if not self.in_place :
+                # like move_sequence, but appending rather than copying the path
+                path.append(next(islice(path[-1].iter_next_states(), move, None)))
+            else :
+                path.append(self.state.wrap(path[-1].get_snapshot().add_piece(move)))
+        return path
+
+
+def _alphabeta(search, node, alpha, beta, depth_limit, maximize, principal_variation=(),
+               ply=0) :
+    """Alpha-beta search below node. Returns (moves, score, evaluations), where
+    moves are the keys of the best path below node, or None if no child
+    improved on the window (the lab's empty path).
+
+    Children are searched in generation order (or the search's move_order),
+    except that the first move of principal_variation (the remaining keys of
+    a previously found best path through node), or else the transposition
+    table's best move, goes first. ply is the distance from the root, which
+    is where killer moves are kept in the search's move_history.
+
+    If search.pvs is set (principal variation search), only the first child
+    gets the full window. The others are first searched with a null window
+    just above alpha (below beta when minimizing), which only tells whether
+    they beat the best child so far, and are searched again with the full
+    window if they do. Evaluations from both searches are counted.
+
+    The search is fail-hard, like the lab's: scores are clamped to the
+    window. If search.fail_soft is set, a node returns its best child's score
+    even if that lies outside the window, which is a tighter bound.
+
+    The tree is walked with an explicit stack of _Frames rather than by
+    recursion, so depth is not limited by Python's recursion limit. Paths
+    are built as linked (move, rest) pairs, which makes extending a path by
+    one move O(1), and turned into a list once, at the end."""
+    pv_links = ()
+    for move in reversed(principal_variation):
+        pv_links = (move, pv_links)
+    links, score, eval_count = _alphabeta_links(search, node, alpha, beta, depth_limit,
+                                                maximize, pv_links, ply)
+    return (_unlink(links), score, eval_count)
+
+
+def _unlink(links) :
+    "Turn a path of linked (move, rest) pairs (or None) into a list (or None)."
+    if links is None:
+        return None
+    path = []
+    while links:
+        move, links = links
+        path.append(move)
+    return path
+
+
+class _Frame :
+    "A node of _alphabeta_links whose children are being searched."
+    __slots__ = ('node', 'alpha', 'beta', 'original_alpha', 'original_beta',
+                 'depth_limit', 'maximize', 'principal_variation', 'first', 'ply',
+                 'key', 'moves', 'index', 'move', 'child', 'child_pv', 'scouting',
+                 'best', 'path', 'eval_count', 'done')
+
+
+def _alphabeta_links(search, node, alpha, beta, depth_limit, maximize,
+                     principal_variation=(), ply=0) :
+    """The engine behind _alphabeta, with the principal variation and the
+    returned path as linked (move, rest) pairs, () being the empty path."""
+    table = search.transposition_table
+    stack = []  # frames of the ancestors of the node being searched
+    frame, result = _enter(search, node, alpha, beta, depth_limit, maximize,
+                           principal_variation, ply)
+    while True:
+        if result is not None:
+            # a child has been searched: hand its result to its parent
+            if not stack:
+                return result
+            frame = stack.pop()
+            result, child_path, child_score, child_evals = None, result[0], result[1], result[2]
+            if frame.scouting:
+                frame.scouting = False
+                if frame.alpha < child_score < frame.beta:
+                    # the child beats the best so far: search it with the full window
+                    frame.eval_count += child_evals
+                    stack.append(frame)
+                    frame, result = _enter(search, frame.child, frame.alpha, frame.beta,
+                                           frame.depth_limit-1, not frame.maximize,
+                                           frame.child_pv, frame.ply+1)
+                    continue
+            search.unmake(frame.node)
+            frame.eval_count += child_evals
+            if frame.maximize:
+                frame.best = max(frame.best, child_score)
+                if (child_score > frame.alpha):
+                    frame.path = (frame.move[0], child_path) if child_path is not None else ()
+                frame.alpha = max(frame.alpha, child_score)
+            else:
+                frame.best = min(frame.best, child_score)
+                if (child_score < frame.beta):
+                    frame.path = (frame.move[0], child_path) if child_path is not None else ()
+                frame.beta = min(frame.beta, child_score)
+            if frame.alpha >= frame.beta:
+                if search.move_history is not None:
+                    search.move_history.record_cutoff(frame.ply, search.move_id(frame.move),
+                                                      frame.depth_limit)
+                frame.done = True
+            continue
+
+        if search.shared_bound is not None and not frame.done:
+            frame.alpha, frame.beta = search.tighten(frame.alpha, frame.beta)
+            frame.done = frame.alpha >= frame.beta
+        move = None if frame.done else next(frame.moves, None)
+        if move is None:
+            # all children searched (or cut off)
+            if search.fail_soft:
+                score = frame.best
+            else:
+                score = frame.alpha if frame.maximize else frame.beta
+            if table is not None:
+                if score <= frame.original_alpha:
+                    bound = table.UPPERBOUND
+                elif score >= frame.original_beta:
+                    bound = table.LOWERBOUND
+                else:
+                    bound = table.EXACT
+                path = search.table_path(frame.node, frame.path)
+                table.store(frame.key, frame.depth_limit, score, bound,
+                            path[0] if path else None, path)
+            result = (frame.path, score, frame.eval_count)
+            continue
+
+        frame.index += 1
+        frame.move = move
+        pv = frame.principal_variation
+        frame.child_pv = pv[1] if pv and move[0] == frame.first else ()
+        frame.child = search.make(frame.node, move)
+        stack.append(frame)
+        if search.pvs and frame.index > 0:
+            frame.scouting = True
+            if frame.maximize:
+                window = (frame.alpha, _nextafter(frame.alpha, INF))
+            else:
+                window = (_nextafter(frame.beta, -INF), frame.beta)
+        else:
+            window = (frame.alpha, frame.beta)
+        frame, result = _enter(search, frame.child, window[0], window[1],
+                               frame.depth_limit-1, not frame.maximize,
+                               frame.child_pv, frame.ply+1)
+
+
+def _enter(search, node, alpha, beta, depth_limit, maximize, principal_variation, ply) :
+    """Start searching node. Returns (None, result) if the node is answered
+    at once (by the transposition table, or as a leaf), or else (frame, None)
+    with a _Frame ready to search its children."""
+    if search.deadline is not None and time.monotonic() > search.deadline:
+        raise SearchTimeout()
+    if search.shared_bound is not None:
+        alpha, beta = search.tighten(alpha, beta)
+
+    table = search.transposition_table
+    entry = key = None
+    if table is not None:
+        key = search.table_key(node, maximize)
+        entry = table.lookup(key)
+        if entry is not None and entry.depth >= depth_limit:
+            if (entry.bound == table.EXACT
+                or (entry.bound == table.LOWERBOUND and entry.score >= beta)
+                or (entry.bound == table.UPPERBOUND and entry.score <= alpha)):
+                if entry.depth != INF:
+                    # the stored search may have stopped at its depth limit
+                    search.reached_horizon = True
+                return (None, (search.table_path(node, entry.path), entry.score, 0))
+
+    if search.is_game_over(node):
+        result = ((), search.endgame_score(node, maximize), 1)
+        if table is not None:
+            table.store(key, INF, result[1], table.EXACT, None, ())
+        return (None, result)
+    elif depth_limit == 0:
+        search.reached_horizon = True
+        result = ((), search.heuristic(node, maximize), 1)
+        if table is not None:
+            table.store(key, 0, result[1], table.EXACT, None, ())
+        return (None, result)
+
+    frame = _Frame()
+    frame.node = node
+    frame.alpha = frame.original_alpha = alpha
+    frame.beta = frame.original_beta = beta
+    frame.depth_limit = depth_limit
+    frame.maximize = maximize
+    frame.principal_variation = principal_variation
+    if principal_variation:
+        frame.first = principal_variation[0]
+    else:
+        frame.first = search.table_move(node, entry.best_move) if entry is not None else None
+    frame.ply = ply
+    frame.key = key
+    frame.moves = iter(search.moves(node, frame.first, ply))
+    frame.index = -1
+    frame.move = frame.child = None
+    frame.child_pv = ()
+    frame.scouting = frame.done = False
+    frame.best = -INF if maximize else INF
+    frame.path = None
+    frame.eval_count = 0
+    return (frame, None)
+
+
+def _aspiration_search(search, depth_limit, maximize, principal_variation, guess, width) :
+    """Alpha-beta search of the root in a window of +/- width around guess
+    (or a full window if guess is None), widening the side that fails until
+    the score falls inside. Returns (moves, score, evaluations, info), where
+    info counts the re-searches after failing low and high."""
+    info = {'fail_low': 0, 'fail_high': 0}
+    if guess is None:
+        alpha, beta = -INF, INF
+    else:
+        alpha, beta = guess - width, guess + width
+    eval_count = 0
+    while True:
+        moves, score, evals = _alphabeta(search, search.root, alpha, beta, depth_limit,
+                                         maximize, principal_variation)
+        eval_count += evals
+        if score <= alpha and alpha > -INF:
+            info['fail_low'] += 1
+            alpha = guess - 2 * width if info['fail_low'] == 1 else -INF
+        elif score >= beta and beta < INF:
+            info['fail_high'] += 1
+            beta = guess + 2 * width if info['fail_high'] == 1 else INF
+        else:
+            return (moves, score, eval_count, info)
+
+
+def minimax_search_alphabeta_parallel(state, alpha=-INF, beta=INF, heuristic_fn=always_zero,
+                                      depth_limit=INF, maximize=True, in_place=False,
+                                      max_workers=None, executor=None, move_order=None) :
+    """Alpha-beta search that splits the children of the root across a process
+    pool. Same arguments and return type as minimax_search_alphabeta.
+
+    The first child is searched locally to establish a bound; the others are
+    handed to workers, at most max_workers at a time. The root's bound is
+    shared with the workers as results come in: each worker rereads it every
+    few dozen nodes and narrows the windows of the searches it is running,
+    so a good score from one child prunes the children still being searched.
+    The score matches the serial search; among equally good moves, the path
+    may differ, and the evaluation count depends on the order in which
+    workers finish.
+
+    The state's functions and heuristic_fn are sent to the workers, so they
+    must be picklable (named module-level functions, not lambdas). Unless an
+    executor is given, every call starts a new ProcessPoolExecutor and shuts
+    it down at the end, which costs far more than a shallow search; pass an
+    existing concurrent.futures executor to reuse one pool across calls. For
+    process pools, the shared bound lives in a multiprocessing Manager, which
+    is also started per call; a ThreadPoolExecutor shares it directly."""
+    search = _SearchContext(state, heuristic_fn, in_place, move_order=move_order)
+    if depth_limit == 0 or search.is_game_over(search.root):
+        return minimax_search_alphabeta(state, alpha, beta, heuristic_fn,
+                                        depth_limit, maximize, in_place,
+                                        move_order=move_order)
+
+    def subtree(move):
+        "An AbstractGameState for the child reached by move."
+        if not in_place:
+            return move[1]
+        return state.wrap(state.get_snapshot().add_piece(move[0]))
+
+    moves = list(search.moves(search.root))
+    eval_count = 0
+    best = None  # (index, moves, score) of the best child so far
+
+    def record(index, result):
+        """Fold one child's result into the root's window, like the serial
+        loop. Only a score beyond the current bound is exact: a child searched
+        while the bound was rising may return the bound itself."""
+        nonlocal alpha, beta, eval_count, best
+        child_moves, score, evals = result
+        eval_count += evals
+        if score > alpha if maximize else score < beta:
+            best = (index, child_moves, score)
+        if maximize:
+            alpha = max(alpha, score)
+        else:
+            beta = min(beta, score)
+        shared_bound.value = alpha if maximize else beta
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers)
+    workers = max_workers or os.cpu_count() or 1
+    manager = None
+    if isinstance(executor, ThreadPoolExecutor):
+        shared_bound = _Bound(alpha if maximize else beta)
+    else:
+        manager = Manager()
+        shared_bound = manager.Value('d', alpha if maximize else beta)
+    pending = {}
+    try:
+        first = _search_subtree(subtree(moves[0]), alpha, beta, heuristic_fn,
+                                depth_limit-1, not maximize, in_place, move_order)
+        record(0, first)
+        queue = list(enumerate(moves))[1:]
+        while (queue or pending) and alpha < beta:
+            while queue and len(pending) < workers:
+                index, move = queue.pop(0)
+                future = executor.submit(_search_subtree, subtree(move), alpha, beta,
+                                         heuristic_fn, depth_limit-1, not maximize,
+                                         in_place, move_order, shared_bound, maximize)
+                pending[future] = index
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                record(pending.pop(future), future.result())
+        for future in pending:
+            future.cancel()
+        # let searches that are still running stop at once
+        shared_bound.value = INF if maximize else -INF
+    finally:
+        if own_executor:
+            executor.shutdown()
+        if manager is not None:
+            manager.shutdown()
+
+    if best is None:
+        path = None
+    else:
+        index, child_moves, score = best
+        path = [moves[index][0]] + child_moves if child_moves is not None else []
+    return (search.build_path(path), alpha if maximize else beta, eval_count)
+
+
+class _Bound :
+    "The shared bound of a parallel search whose workers are threads."
+    def __init__(self, value) :
+        self.value = value
+
+
+def _search_subtree(state, alpha, beta, heuristic_fn, depth_limit, maximize, in_place,
+                    move_order=None, shared_bound=None, bound_is_alpha=True):
+    """Worker for minimax_search_alphabeta_parallel: alpha-beta search from
+    state, returning the move keys of the best path rather than states. If a
+    shared_bound is given, the search's windows are narrowed by it."""
+    search = _SearchContext(state, heuristic_fn, in_place, move_order=move_order)
+    if shared_bound is not None:
+        search.share_bound(shared_bound, bound_is_alpha)
+    return _alphabeta(search, search.root, alpha, beta, depth_limit, maximize)
+
+
+# minimax_search with a batch_heuristic_fn expands the tree to the depth limit
+# first, so that the whole frontier can be scored at once.
+
+def _minimax_search_batched(state, batch_heuristic_fn, depth_limit, maximize) :
+    """minimax_search scoring its frontier with one call to batch_heuristic_fn."""
+    frontier = {True: [], False: []}
+    root = _expand_to_horizon(state, depth_limit, maximize, frontier)
+    for is_maximizer, leaves in frontier.items():
+        if not leaves:
+            continue
+        scores = batch_heuristic_fn([leaf[0].get_snapshot() for leaf in leaves], is_maximizer)
+        if hasattr(scores, 'tolist'):  # e.g. a NumPy array
+            scores = scores.tolist()
+        for leaf, score in zip(leaves, scores):
+            leaf[1] = score
+    return _back_up(root, maximize)
+
+def _expand_to_horizon(state, depth_limit, maximize, frontier) :
+    """Expand the tree below state as minimax_search would. Returns nested
+    [state, score, children] lists; the leaves at the depth limit are left
+    unscored, and added to frontier[maximize]."""
+    if state.is_game_over():
+        return [state, state.get_endgame_score(maximize), []]
+    elif depth_limit == 0:
+        leaf = [state, None, []]
+        frontier[maximize].append(leaf)
+        return leaf
+    else:
+        return [state, None, [_expand_to_horizon(child, depth_limit-1, not maximize, frontier)
+                              for child in state.generate_next_states()]]
+
+def _back_up(node, maximize) :
+    "Back up the scores of a tree built by _expand_to_horizon, as minimax_search."
+    state, score, children = node
+    if not children:
+        return ([state], score, 1)
+    branches = [_back_up(child, not maximize) for child in children]
+    if maximize:
+        best_path = max(branches, key=lambda x: x[1])
+    else:
+        best_path = min(branches, key=lambda x: x[1])
+    eval_count = sum(branch[2] for branch in branches)
+    return ([state] + best_path[0], best_path[1], eval_count)
+
+
 #### Part 3: Multiple Choice ###################################################
 
 ANSWER_1 = '4' # Have to search every node if normal DFS
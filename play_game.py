@@ -21,7 +21,7 @@ def new_state(snap=None):
     state_starting_connectfour = AbstractGameState(
         snapshot=board,
         is_game_over_fn=is_game_over_connectfour,
-        generate_next_states_fn=next_boards_connectfour,
+        generate_next_states_fn=iter_next_boards_connectfour,
         endgame_score_fn=endgame_score_connectfour_faster)
     return state_starting_connectfour
 
@@ -104,10 +104,7 @@ def ai_turn(state, depth_limit):
 
 
 def was_a_draw(state):
-    for chain in state.snapshot.get_all_chains():
-        if len(chain) >= 4:
-            return False
-    return True
+    return not state.snapshot.has_four_in_a_row()
 
 
 def print_endgame(state, players_move):
@@ -1,11 +1,20 @@
 # MIT 6.034 Lab 2: Games
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import random
 from tester import make_test, get_tests
 from game_api import *
 from boards import *
-from lab2 import (next_boards_connectfour, is_game_over_connectfour,
+try:
+    import numpy
+except ImportError:
+    numpy = None  # the batch functions are only tested with NumPy
+from lab2 import (next_boards_connectfour, iter_next_boards_connectfour,
+                  is_game_over_connectfour,
                   endgame_score_connectfour, endgame_score_connectfour_faster,
-                  minimax_search)
+                  minimax_search, minimax_search_alphabeta,
+                  order_columns_center_out, mtdf,
+                  heuristic_connectfour)
 INF = float('inf')
 lab_number = 2
 
@@ -767,3 +776,614 @@ make_test(type = 'VALUE',
           testanswer = ANSWER_4_testanswer,
           expected_val = "correct value of ANSWER_4 ('1', '2', '3', '4', or '5')",
           name = ANSWER_4_getargs)
+
+
+#### Search engine extensions ##################################
+
+def engine_game_UHOH():
+    return AbstractGameState(BOARD_UHOH, is_game_over_connectfour,
+                             next_boards_connectfour, endgame_score_connectfour)
+
+def engine_chain_heuristic(board, maximize):
+    valuate = lambda board, player : len(sum(board.get_all_chains(player),[]))
+    return [-1,1][maximize] * (valuate(board,True) - valuate(board, False))
+
+# Playing moves in place on one board must not change the search result.
+def alphabeta_in_place_getargs() :  #TEST 45
+    return [engine_game_UHOH(), -INF, INF, engine_chain_heuristic, 3, True, True]
+
+def alphabeta_in_place_testanswer(val, original_val = None) :
+    return (is_dfs_return_type(val)
+            and move_sequence(engine_game_UHOH(), [4,5,2]) == val[0]
+            and (val[1],val[2]) == (1,152)
+            and BOARD_UHOH.count_pieces() == 5)
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = alphabeta_in_place_getargs,
+          testanswer = alphabeta_in_place_testanswer,
+          expected_val = ("List of (best_path, leaf_score, evaluation_count) "
+                          +"matching minimax_search_alphabeta without in_place, "
+                          +"with the original board left unchanged."),
+          name = 'minimax_search_alphabeta')
+
+
+def engine_game_33():
+    return AbstractGameState(BOARD_EMPTY.add_piece(3).add_piece(3), is_game_over_connectfour,
+                             next_boards_connectfour, endgame_score_connectfour)
+
+def engine_density_heuristic(board, maximize):
+    valuate = lambda board, player : len(sum(board.get_all_chains(player),[]))
+    density = lambda board, player : sum([abs(index-3)
+                                          for row in board.board_array
+                                          for (piece, index) in zip(row, list(range(board.num_cols)))
+                                          if piece and (piece == 1) == (board.count_pieces() + player) % 2])
+    return [-1,1][maximize] * (density(board, False) - density(board, True)
+                               + 2*valuate(board,True) - 3*valuate(board, False))
+
+# A transposition table finds the same minimax value and path as minimax_4,
+# with fewer evaluations than plain alpha-beta (which needs 695).
+def alphabeta_transposition_getargs() :  #TEST 46
+    return [engine_game_33(), -INF, INF, engine_density_heuristic, 4, True, False,
+            TranspositionTable()]
+
+def alphabeta_transposition_testanswer(val, original_val = None) :
+    return (is_dfs_return_type(val)
+            and move_sequence(engine_game_33(), [3,1,3,2]) == val[0]
+            and (val[1],val[2]) == (-3,475))
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = alphabeta_transposition_getargs,
+          testanswer = alphabeta_transposition_testanswer,
+          expected_val = ("List of (best_path, leaf_score, evaluation_count) "
+                          +"with the minimax score -3 and 475 evaluations."),
+          name = 'minimax_search_alphabeta')
+
+
+# Reusing the previous best path and a shared transposition table gives the
+# same scores as progressive_1 with far fewer total evaluations than 3171.
+def progressive_reuse_getargs() :  #TEST 47
+    return [engine_game_33(), engine_density_heuristic, 5, True, False, True,
+            TranspositionTable()]
+
+def progressive_reuse_testanswer(val, original_val = None) :
+    if not is_class_instance(val, 'AnytimeValue'):
+        return False
+    h = val.history
+    return (all(map(is_dfs_return_type, h))
+            and [4, -2, 5, -3, 20] == [x[1] for x in h]
+            and val.total_evaluations == 1650)
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = progressive_reuse_getargs,
+          testanswer = progressive_reuse_testanswer,
+          expected_val = ("An AnytimeValue object with the scores of progressive_1 "
+                          +"and 1650 total evaluations."),
+          name = 'progressive_deepening')
+
+
+# With no time to spare, only the first iteration (which always completes)
+# is kept.
+def progressive_time_limit_getargs() :  #TEST 48
+    return [GAME_STATIC_ALL_LEVELS, toytree_heuristic_fn, 3, True, False, False,
+            None, 0]
+
+def progressive_time_limit_testanswer(val, original_val = None) :
+    if not is_class_instance(val, 'AnytimeValue'):
+        return False
+    h = val.history
+    return (all(map(is_dfs_return_type, h))
+            and [11] == [x[1] for x in h] and [4] == [x[2] for x in h])
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = progressive_time_limit_getargs,
+          testanswer = progressive_time_limit_testanswer,
+          expected_val = ("An AnytimeValue object holding only the depth-1 result "
+                          +"of progressive_0."),
+          name = 'progressive_deepening')
+
+
+# Trying the center columns first finds the same move with fewer evaluations.
+def alphabeta_move_order_getargs() :  #TEST 49
+    return [engine_game_UHOH(), -INF, INF, engine_chain_heuristic, 3, True, False,
+            None, order_columns_center_out]
+
+def alphabeta_move_order_testanswer(val, original_val = None) :
+    return (is_dfs_return_type(val)
+            and move_sequence(engine_game_UHOH(), [4,5,2]) == val[0]
+            and (val[1],val[2]) == (1,114))
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = alphabeta_move_order_getargs,
+          testanswer = alphabeta_move_order_testanswer,
+          expected_val = ("List of (best_path, leaf_score, evaluation_count) "
+                          +"with the path and score of the unordered search "
+                          +"and 114 evaluations."),
+          name = 'minimax_search_alphabeta')
+
+
+# Killer moves and history scores learned at one depth prune the next ones.
+def progressive_move_history_getargs() :  #TEST 50
+    return [engine_game_UHOH(), engine_chain_heuristic, 3, True, False, False,
+            None, None, None, MoveHistory()]
+
+def progressive_move_history_testanswer(val, original_val = None) :
+    if not is_class_instance(val, 'AnytimeValue'):
+        return False
+    h = val.history
+    return (all(map(is_dfs_return_type, h))
+            and [3, -3, 1] == [x[1] for x in h]
+            and [7, 23, 25] == [x[2] for x in h])
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = progressive_move_history_getargs,
+          testanswer = progressive_move_history_testanswer,
+          expected_val = ("An AnytimeValue object with scores [3, -3, 1] and "
+                          +"evaluation counts [7, 23, 25] (198 evaluations "
+                          +"in total without a MoveHistory)."),
+          name = 'progressive_deepening')
+
+
+# Principal variation search finds the same scores; with the moves ordered
+# by a MoveHistory, most null-window scouts succeed.
+def progressive_pvs_getargs() :  #TEST 51
+    return [engine_game_33(), engine_density_heuristic, 5, True, False, False,
+            None, None, None, MoveHistory(), True]
+
+def progressive_pvs_testanswer(val, original_val = None) :
+    if not is_class_instance(val, 'AnytimeValue'):
+        return False
+    h = val.history
+    return (all(map(is_dfs_return_type, h))
+            and [4, -2, 5, -3, 20] == [x[1] for x in h]
+            and [10, 66, 72, 117, 1234] == [x[2] for x in h])
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = progressive_pvs_getargs,
+          testanswer = progressive_pvs_testanswer,
+          expected_val = ("An AnytimeValue object with the scores of progressive_1 "
+                          +"and 1499 total evaluations."),
+          name = 'progressive_deepening')
+
+
+# MTD(f) converges on the minimax score (and path) with null-window passes.
+def mtdf_getargs() :  #TEST 52
+    return [engine_game_UHOH(), engine_chain_heuristic, 3, True]
+
+def mtdf_testanswer(val, original_val = None) :
+    if not is_class_instance(val, 'AnytimeValue'):
+        return False
+    h = val.history
+    return (all(map(is_dfs_return_type, h))
+            and move_sequence(engine_game_UHOH(), [4,5,2]) == val.get_value()[0]
+            and [3, -3, 1] == [x[1] for x in h]
+            and [7, 37, 21] == [x[2] for x in h]
+            and [4, 6, 5] == [x['passes'] for x in val.info])
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = mtdf_getargs,
+          testanswer = mtdf_testanswer,
+          expected_val = ("An AnytimeValue object ending with the path and score "
+                          +"of minimax_search (which needs 307 evaluations), "
+                          +"after 65 evaluations in 15 passes."),
+          name = 'mtdf')
+
+
+# Aspiration windows record how often each depth had to be searched again.
+def progressive_aspiration_getargs() :  #TEST 53
+    return [engine_game_33(), engine_density_heuristic, 5, True, False, False,
+            None, None, None, None, False, 5]
+
+def progressive_aspiration_testanswer(val, original_val = None) :
+    if not is_class_instance(val, 'AnytimeValue'):
+        return False
+    h = val.history
+    return (all(map(is_dfs_return_type, h))
+            and [4, -2, 5, -3, 20] == [x[1] for x in h]
+            and [7, 45, 195, 562, 2691] == [x[2] for x in h]
+            and ([(0, 0), (1, 0), (0, 1), (1, 0), (0, 2)]
+                 == [(x['fail_low'], x['fail_high']) for x in val.info]))
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = progressive_aspiration_getargs,
+          testanswer = progressive_aspiration_testanswer,
+          expected_val = ("An AnytimeValue object with the scores of progressive_1 "
+                          +"and the fail-low and fail-high counts of each depth."),
+          name = 'progressive_deepening')
+
+
+# Caching the heuristic doesn't change the search, but the deeper iterations
+# of progressive deepening re-score many boards.
+engine_heuristic_cache = HeuristicCache(engine_density_heuristic)
+
+def progressive_heuristic_cache_getargs() :  #TEST 54
+    engine_heuristic_cache.clear()
+    return [engine_game_33(), engine_heuristic_cache, 5, True]
+
+def progressive_heuristic_cache_testanswer(val, original_val = None) :
+    if not is_class_instance(val, 'AnytimeValue'):
+        return False
+    h = val.history
+    return (all(map(is_dfs_return_type, h))
+            and [4, -2, 5, -3, 20] == [x[1] for x in h]
+            and [7, 34, 176, 695, 2259] == [x[2] for x in h]
+            and (engine_heuristic_cache.hits, engine_heuristic_cache.misses) == (1226, 1724))
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = progressive_heuristic_cache_getargs,
+          testanswer = progressive_heuristic_cache_testanswer,
+          expected_val = ("An AnytimeValue object matching progressive_1, with "
+                          +"1226 of the 3171 evaluations answered by the cache."),
+          name = 'progressive_deepening')
+
+
+# Once the root board keeps its chain counts, every board played from it
+# updates them incrementally, and heuristic_connectfour just looks them up.
+def engine_game_UHOH_counted():
+    board = BOARD_UHOH.copy()
+    board.get_chain_counts()
+    return AbstractGameState(board, is_game_over_connectfour,
+                             next_boards_connectfour, endgame_score_connectfour)
+
+def alphabeta_chain_counts_getargs() :  #TEST 55
+    return [engine_game_UHOH_counted(), -INF, INF, heuristic_connectfour, 4, True, True]
+
+def alphabeta_chain_counts_testanswer(val, original_val = None) :
+    return (is_dfs_return_type(val)
+            and move_sequence(engine_game_UHOH(), [4,5,2,6]) == val[0]
+            and (val[1],val[2]) == (-125,957))
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = alphabeta_chain_counts_getargs,
+          testanswer = alphabeta_chain_counts_testanswer,
+          expected_val = ("List of (best_path, leaf_score, evaluation_count) "
+                          +"matching the search without chain counts."),
+          name = 'minimax_search_alphabeta')
+
+
+# With a batch heuristic, minimax_search scores the whole frontier in one call
+# (the 6 leaves where the game is over still get their endgame scores).
+engine_batch_calls = []
+
+def engine_chain_heuristic_batch(boards, maximize):
+    engine_batch_calls.append(len(boards))
+    return [engine_chain_heuristic(board, maximize) for board in boards]
+
+def minimax_batch_getargs() :  #TEST 56
+    del engine_batch_calls[:]
+    return [engine_game_UHOH(), always_zero, 2, True, engine_chain_heuristic_batch]
+
+def minimax_batch_testanswer(val, original_val = None) :
+    return (is_dfs_return_type(val)
+            and move_sequence(engine_game_UHOH(), [4,5]) == val[0]
+            and (val[1],val[2]) == (-3,49)
+            and engine_batch_calls == [43])
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = minimax_batch_getargs,
+          testanswer = minimax_batch_testanswer,
+          expected_val = ("List of (best_path, leaf_score, evaluation_count) "
+                          +"matching minimax_3, with the 43 boards at the depth "
+                          +"limit scored in one call to the batch heuristic."),
+          name = 'minimax_search')
+
+
+# A symmetric transposition table answers each position's mirror image too,
+# so it needs a third of the entries and evaluations of a plain one.
+engine_symmetric_table = TranspositionTable(symmetric=True)
+
+def engine_game_empty():
+    return AbstractGameState(BOARD_EMPTY, is_game_over_connectfour,
+                             next_boards_connectfour, endgame_score_connectfour)
+
+def alphabeta_symmetric_table_getargs() :  #TEST 57
+    engine_symmetric_table.clear()
+    return [engine_game_empty(), -INF, INF, heuristic_connectfour, 5, True, True,
+            engine_symmetric_table]
+
+def alphabeta_symmetric_table_testanswer(val, original_val = None) :
+    return (is_dfs_return_type(val)
+            and move_sequence(engine_game_empty(), [0,0,1,1,2]) == val[0]
+            and (val[1],val[2]) == (50,416)
+            and len(engine_symmetric_table) == 628)
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = alphabeta_symmetric_table_getargs,
+          testanswer = alphabeta_symmetric_table_testanswer,
+          expected_val = ("List of (best_path, leaf_score, evaluation_count) "
+                          +"with the score of the search without a table, after "
+                          +"416 evaluations and 628 table entries (not 1270 and 1770)."),
+          name = 'minimax_search_alphabeta')
+
+
+# Move descriptions are formatted lazily, but must still name the player who
+# moved, even if the turn is changed afterwards.
+def next_boards_describe_getargs() :  #TEST 58
+    return [BOARD_EMPTY]
+
+def next_boards_describe_testanswer(val, original_val = None) :
+    if not (isinstance(val, list) and len(val) == 7):
+        return False
+    board = val[1]
+    same_as_add_piece = (board == BOARD_EMPTY.add_piece(1))
+    board.set_current_player_name(board.players[1])
+    return (same_as_add_piece
+            and board.describe_previous_move() == "Put Luke's piece in col 1"
+            and board.mirror().describe_previous_move() == "Put Luke's piece in col 5")
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = next_boards_describe_getargs,
+          testanswer = next_boards_describe_testanswer,
+          expected_val = ("List of the 7 boards after the first move, whose "
+                          +"descriptions keep naming Luke."),
+          name = 'next_boards_connectfour')
+
+
+# The search engine keeps its own stack, so a game 5000 moves long is searched
+# to the end without reaching Python's recursion limit.
+def engine_game_long_chain(length):
+    return AbstractGameState(0, lambda moves : moves >= length,
+                             lambda moves : [moves + 1], lambda moves, maximize : moves)
+
+def alphabeta_long_chain_getargs() :  #TEST 59
+    return [engine_game_long_chain(5000), -INF, INF, always_zero, INF, True]
+
+def alphabeta_long_chain_testanswer(val, original_val = None) :
+    return (is_dfs_return_type(val)
+            and [state.get_snapshot() for state in val[0]] == list(range(5001))
+            and (val[1],val[2]) == (5000,1))
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = alphabeta_long_chain_getargs,
+          testanswer = alphabeta_long_chain_testanswer,
+          expected_val = ("List of (best_path, leaf_score, evaluation_count) "
+                          +"for the path through all 5000 moves."),
+          name = 'minimax_search_alphabeta')
+
+
+# The parallel search must find the serial search's score. A small thread pool
+# keeps the test quick; with only 2 workers, the later children wait for a slot
+# and get the bounds found so far.
+engine_executor = None
+
+def alphabeta_parallel_getargs() :  #TEST 60
+    global engine_executor
+    engine_executor = ThreadPoolExecutor(2)
+    return [engine_game_UHOH(), -INF, INF, heuristic_connectfour, 3, True, False,
+            2, engine_executor]
+
+def alphabeta_parallel_testanswer(val, original_val = None) :
+    engine_executor.shutdown()
+    serial = minimax_search_alphabeta(engine_game_UHOH(), -INF, INF, heuristic_connectfour, 3, True)
+    return (is_dfs_return_type(val)
+            and val[0][0] == engine_game_UHOH() and len(val[0]) == 4
+            and val[1] == serial[1] == 25)
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = alphabeta_parallel_getargs,
+          testanswer = alphabeta_parallel_testanswer,
+          expected_val = ("List of (best_path, leaf_score, evaluation_count) "
+                          +"with the score of minimax_search_alphabeta."),
+          name = 'minimax_search_alphabeta_parallel')
+
+
+# With memoize=False, every is_game_over and get_endgame_score call goes back
+# to the game's functions. With memoization, a state's children are handed to
+# the search rather than kept, so afterwards the root builds them anew.
+engine_calls = {'is_game_over': 0, 'next_states': 0}
+
+def engine_counted_game_over(board):
+    engine_calls['is_game_over'] += 1
+    return is_game_over_connectfour(board)
+
+def engine_counted_next_states(board):
+    engine_calls['next_states'] += 1
+    return next_boards_connectfour(board)
+
+def engine_game_UHOH_calls_counted(memoize):
+    engine_calls.update(is_game_over = 0, next_states = 0)
+    return AbstractGameState(BOARD_UHOH, engine_counted_game_over, engine_counted_next_states,
+                             endgame_score_connectfour, memoize)
+
+def minimax_memoize_getargs() :  #TEST 61
+    return [engine_game_UHOH_calls_counted(False), engine_chain_heuristic, 2, True]
+
+def minimax_memoize_testanswer(val, original_val = None) :
+    uncached = (engine_calls['is_game_over'], engine_calls['next_states'])
+    state = engine_game_UHOH_calls_counted(True)
+    cached_val = minimax_search(state, engine_chain_heuristic, 2, True)
+    cached = (engine_calls['is_game_over'], engine_calls['next_states'])
+    state.generate_next_states()
+    return (is_dfs_return_type(val) and (val[1],val[2]) == (-3,49)
+            and cached_val[1:] == val[1:]
+            and uncached == (63,59) and cached == (57,51)
+            and engine_calls['next_states'] == 52)
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = minimax_memoize_getargs,
+          testanswer = minimax_memoize_testanswer,
+          expected_val = ("List of (best_path, leaf_score, evaluation_count) "
+                          +"matching minimax_3, calling the game's functions "
+                          +"more often than a memoized search."),
+          name = 'minimax_search')
+
+
+# The NumPy batch functions must agree with the scalar ones, board for board,
+# including boards built from arrays with gaps in their columns. These tests
+# are only run where NumPy is installed.
+def engine_batch_boards():
+    rng = random.Random(6034)
+    boards = [ConnectFourBoard([[1,2,1,2,1,2,1],[0]*7,[0]*7,[0]*7,[0]*7,[2,1,2,1,2,1,2]])]
+    for i in range(150):
+        board = ConnectFourBoard()
+        for move in range(rng.randint(0, 42)):
+            board = board.add_piece(rng.choice([col for col in range(7)
+                                                if not board.is_column_full(col)]))
+            if is_game_over_connectfour(board):
+                break
+        boards.append(board)
+        boards.append(ConnectFourBoard([[rng.choice([0, 0, 1, 2]) for col in range(7)]
+                                        for row in range(6)]))
+    return boards
+
+def game_over_batch_getargs() :  #TEST 62
+    return [engine_batch_boards()]
+
+def game_over_batch_testanswer(val, original_val = None) :
+    return list(val) == list(map(is_game_over_connectfour, engine_batch_boards()))
+
+def heuristic_batch_getargs() :  #TEST 63
+    return [engine_batch_boards(), False]
+
+def heuristic_batch_testanswer(val, original_val = None) :
+    return list(val) == [heuristic_connectfour(board, False) for board in engine_batch_boards()]
+
+if numpy is not None:
+    make_test(type = 'FUNCTION_ENCODED_ARGS',
+              getargs = game_over_batch_getargs,
+              testanswer = game_over_batch_testanswer,
+              expected_val = ("NumPy array of is_game_over_connectfour for each "
+                              +"of the boards."),
+              name = 'is_game_over_connectfour_batch')
+
+    make_test(type = 'FUNCTION_ENCODED_ARGS',
+              getargs = heuristic_batch_getargs,
+              testanswer = heuristic_batch_testanswer,
+              expected_val = ("NumPy array of heuristic_connectfour for each "
+                              +"of the boards."),
+              name = 'heuristic_connectfour_batch')
+
+
+# With a generator for generate_next_states_fn, alpha-beta only builds the
+# children it visits (and the first child of each leaf, to see that the game
+# isn't over); minimax_search builds all 658 boards of the same tree.
+engine_boards_built = [0]
+
+def engine_counted_boards(board):
+    for child in iter_next_boards_connectfour(board):
+        engine_boards_built[0] += 1
+        yield child
+
+def alphabeta_lazy_children_getargs() :  #TEST 64
+    engine_boards_built[0] = 0
+    return [AbstractGameState(BOARD_UHOH, is_game_over_connectfour, engine_counted_boards,
+                              endgame_score_connectfour),
+            -INF, INF, engine_chain_heuristic, 3, True]
+
+def alphabeta_lazy_children_testanswer(val, original_val = None) :
+    return (is_dfs_return_type(val)
+            and (val[1],val[2]) == (1,152)
+            and engine_boards_built[0] == 352)
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = alphabeta_lazy_children_getargs,
+          testanswer = alphabeta_lazy_children_testanswer,
+          expected_val = ("List of (best_path, leaf_score, evaluation_count), "
+                          +"after building only 352 of the 658 boards below BOARD_UHOH."),
+          name = 'minimax_search_alphabeta')
+
+
+# Equal boards and states hash equal, however the board was built, and play()
+# and undo() keep a board's hash up to date.
+def next_boards_hash_getargs() :  #TEST 65
+    return [BOARD_UHOH]
+
+def next_boards_hash_testanswer(val, original_val = None) :
+    board = BOARD_UHOH.copy()
+    before = hash(board)
+    for child in val:
+        col = child.get_last_move()[0]
+        from_array = ConnectFourBoard(child.board_array, child.players, child.whose_turn)
+        state = AbstractGameState(child, is_game_over_connectfour,
+                                  next_boards_connectfour, endgame_score_connectfour)
+        same_state = AbstractGameState(BOARD_UHOH.add_piece(col), is_game_over_connectfour,
+                                       next_boards_connectfour, endgame_score_connectfour)
+        played = hash(board.play(col))
+        board.undo()
+        if not (child == BOARD_UHOH.add_piece(col)
+                and hash(child) == hash(BOARD_UHOH.add_piece(col)) == hash(from_array)
+                and state == same_state and hash(state) == hash(same_state)
+                and played == hash(child) and hash(board) == before):
+            return False
+    return len(val) == 7 and before == hash(BOARD_UHOH)
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = next_boards_hash_getargs,
+          testanswer = next_boards_hash_testanswer,
+          expected_val = ("List of the 7 boards after BOARD_UHOH, hashing the "
+                          +"same as the equal boards built in other ways."),
+          name = 'next_boards_connectfour')
+
+
+# In a board built from an array with a gap in a column, the piece that fills
+# the gap joins the pieces above it into one stack, and the next piece goes on
+# top of them all.
+def engine_gap_board():
+    board_array = [[0]*7 for row in range(6)]
+    board_array[5][0] = 1
+    board_array[3][0] = 2
+    return ConnectFourBoard(board_array)
+
+def next_boards_gap_getargs() :  #TEST 66
+    return [engine_gap_board()]
+
+def next_boards_gap_testanswer(val, original_val = None) :
+    filled = val[0]
+    board = filled.add_piece(0)
+    played = engine_gap_board().play(0).play(0)
+    played.undo()
+    return (filled.get_column_height(0) == 3
+            and board.get_column_height(0) == 4 and board.count_pieces() == 4
+            and [row[0] for row in board.board_array] == [None, None, 2, 2, 1, 1]
+            and played == filled and played.get_column_height(0) == 3)
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = next_boards_gap_getargs,
+          testanswer = next_boards_gap_testanswer,
+          expected_val = ("List of the 7 boards after a board with a gap in "
+                          +"column 0, in which the next piece in column 0 "
+                          +"stacks on top of the piece above the gap."),
+          name = 'next_boards_connectfour')
+
+
+# Once the game below NEARLY_OVER is searched to the end, progressive
+# deepening with a time limit stops rather than repeating the same search
+# until the time is spent.
+def progressive_solved_getargs() :  #TEST 67
+    GAME = AbstractGameState(NEARLY_OVER, is_game_over_connectfour, next_boards_connectfour, endgame_score_connectfour)
+    return [GAME, heuristic_connectfour, INF, True, False, False, None, 2]
+
+def progressive_solved_testanswer(val, original_val = None) :
+    if not is_class_instance(val, 'AnytimeValue'):
+        return False
+    return ([125, 0, 1000, 1000, 1000, 1000] == [x[1] for x in val.history]
+            and val.total_evaluations == 26)
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = progressive_solved_getargs,
+          testanswer = progressive_solved_testanswer,
+          expected_val = ("An AnytimeValue object with 6 depths, the last of "
+                          +"which searched every game to its end."),
+          name = 'progressive_deepening')
+
+
+# The same with a process pool, which pickles the states and functions for
+# the workers and shares the root's bound through a multiprocessing Manager.
+def alphabeta_parallel_processes_getargs() :  #TEST 68
+    global engine_executor
+    engine_executor = ProcessPoolExecutor(2)
+    return [engine_game_UHOH(), -INF, INF, heuristic_connectfour, 2, True, False,
+            2, engine_executor]
+
+def alphabeta_parallel_processes_testanswer(val, original_val = None) :
+    engine_executor.shutdown()
+    serial = minimax_search_alphabeta(engine_game_UHOH(), -INF, INF, heuristic_connectfour, 2, True)
+    return (is_dfs_return_type(val)
+            and val[0][0] == engine_game_UHOH() and len(val[0]) == 3
+            and val[1] == serial[1])
+
+make_test(type = 'FUNCTION_ENCODED_ARGS',
+          getargs = alphabeta_parallel_processes_getargs,
+          testanswer = alphabeta_parallel_processes_testanswer,
+          expected_val = ("List of (best_path, leaf_score, evaluation_count) "
+                          +"with the score of minimax_search_alphabeta."),
+          name = 'minimax_search_alphabeta_parallel')